@@ -17,6 +17,20 @@ from typing import Optional
 # Firestore Write Operations
 # =============================================================================
 
+# project_id -> firestore.Client, so warm instances reuse the gRPC channel
+_firestore_clients = {}
+
+
+def _get_firestore_client(project_id: Optional[str] = None):
+    """Get a Firestore client for the project, created once per process."""
+    if project_id is None:
+        project_id = os.getenv("GCP_PROJECT_ID")
+    if project_id not in _firestore_clients:
+        from google.cloud import firestore
+        _firestore_clients[project_id] = firestore.Client(project=project_id)
+    return _firestore_clients[project_id]
+
+
 def save_history_id(history_id: str, project_id: Optional[str] = None) -> None:
     """Save the last processed Gmail history ID to Firestore.
 
@@ -25,10 +39,7 @@ def save_history_id(history_id: str, project_id: Optional[str] = None) -> None:
         project_id: GCP project ID (defaults to GCP_PROJECT_ID env var)
     """
     try:
-        from google.cloud import firestore
-        if project_id is None:
-            project_id = os.getenv("GCP_PROJECT_ID")
-        db = firestore.Client(project=project_id)
+        db = _get_firestore_client(project_id)
         db.collection("config").document("gmail_history").set({
             "history_id": history_id,
             "updated_at": datetime.now().isoformat()
@@ -53,10 +64,7 @@ def mark_email_processed(email_id: str, order_id: str, project_id: Optional[str]
         True if marked successfully, False if already processed
     """
     try:
-        from google.cloud import firestore
-        if project_id is None:
-            project_id = os.getenv("GCP_PROJECT_ID")
-        db = firestore.Client(project=project_id)
+        db = _get_firestore_client(project_id)
         doc_ref = db.collection("processed_emails").document(email_id)
 
         # Use create() which fails if document exists - atomic operation
@@ -74,6 +82,102 @@ def mark_email_processed(email_id: str, order_id: str, project_id: Optional[str]
         return False
 
 
+def claim_history_id(history_id: str, window_seconds: int = 60,
+                     project_id: Optional[str] = None) -> bool:
+    """Claim a Gmail push notification's history ID for this instance.
+
+    Gmail often sends several notifications for one burst of mail. The
+    claim runs in a Firestore transaction against a single document holding
+    the last claimed ID, so only the first instance to see a history ID
+    processes it; redeliveries within the window back off.
+
+    Args:
+        history_id: The Gmail history ID from the notification
+        window_seconds: How long a claim blocks other instances
+        project_id: GCP project ID (defaults to GCP_PROJECT_ID env var)
+
+    Returns:
+        True if this instance should process the notification
+    """
+    try:
+        import time
+        from google.cloud import firestore
+
+        db = _get_firestore_client(project_id)
+        doc_ref = db.collection("config").document("gmail_history_claim")
+        now = time.time()
+
+        @firestore.transactional
+        def claim(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            if (snapshot.exists
+                    and snapshot.get("history_id") == str(history_id)
+                    and (snapshot.get("claimed_at") or 0) > now - window_seconds):
+                return False
+            transaction.set(doc_ref, {"history_id": str(history_id), "claimed_at": now})
+            return True
+
+        claimed = claim(db.transaction())
+        if not claimed:
+            print(f"History ID {history_id} already claimed by another instance")
+        return claimed
+    except Exception as e:
+        # Fail open: a missed notification is worse than duplicate work,
+        # and per-email claims still prevent double-processing
+        print(f"Error claiming history ID: {e}")
+        return True
+
+
+def release_history_id(history_id: str, project_id: Optional[str] = None) -> None:
+    """Release a claim from claim_history_id so a retry can process the ID.
+
+    Only clears the claim if it still holds this history ID; a newer
+    notification's claim is left alone.
+
+    Args:
+        history_id: The Gmail history ID that was claimed
+        project_id: GCP project ID (defaults to GCP_PROJECT_ID env var)
+    """
+    try:
+        from google.cloud import firestore
+
+        db = _get_firestore_client(project_id)
+        doc_ref = db.collection("config").document("gmail_history_claim")
+
+        @firestore.transactional
+        def release(transaction):
+            snapshot = doc_ref.get(transaction=transaction)
+            if snapshot.exists and snapshot.get("history_id") == str(history_id):
+                transaction.delete(doc_ref)
+
+        release(db.transaction())
+    except Exception as e:
+        print(f"Error releasing history ID: {e}")
+
+
+def save_category_rule(pattern: str, category: str, project_id: Optional[str] = None) -> None:
+    """Save a learned item pattern -> category rule to Firestore.
+
+    Args:
+        pattern: Lowercased substring of an item title
+        category: YNAB category name to assign
+        project_id: GCP project ID (defaults to GCP_PROJECT_ID env var)
+    """
+    try:
+        import hashlib
+        db = _get_firestore_client(project_id)
+        # Patterns may contain "/", which Firestore doesn't allow in document IDs
+        doc_id = hashlib.sha1(pattern.encode("utf-8")).hexdigest()
+        db.collection("category_rules").document(doc_id).set({
+            "pattern": pattern,
+            "category": category,
+            "updated_at": datetime.now().isoformat()
+        })
+        print(f"Saved category rule: '{pattern}' -> '{category}'")
+    except Exception as e:
+        print(f"Error saving category rule: {e}")
+
+
 def save_watch_expiration(expiration: int, project_id: Optional[str] = None) -> None:
     """Save the Gmail watch expiration timestamp to Firestore.
 
@@ -82,10 +186,7 @@ def save_watch_expiration(expiration: int, project_id: Optional[str] = None) ->
         project_id: GCP project ID (defaults to GCP_PROJECT_ID env var)
     """
     try:
-        from google.cloud import firestore
-        if project_id is None:
-            project_id = os.getenv("GCP_PROJECT_ID")
-        db = firestore.Client(project=project_id)
+        db = _get_firestore_client(project_id)
         db.collection("config").document("gmail_watch").set({
             "expiration": expiration,
             "updated_at": datetime.now().isoformat()
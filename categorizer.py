@@ -3,15 +3,16 @@
 import json
 from dataclasses import dataclass
 from decimal import Decimal
-from typing import List, Optional
-
-import anthropic
+from typing import TYPE_CHECKING, Dict, List, Optional
 
 from amazon_parser import AmazonItem, AmazonOrder
 from config import CLAUDE_MODEL
 from ynab_client import YNABCategory
 from utils import get_cached_category, cache_category, save_category_cache
 
+if TYPE_CHECKING:
+    import anthropic
+
 
 @dataclass
 class CategoryAssignment:
@@ -35,17 +36,23 @@ class CategorizationResult:
 def categorize_order(
     order: AmazonOrder,
     categories: List[YNABCategory],
-    client: anthropic.Anthropic,
-    model: str = CLAUDE_MODEL
+    client: "anthropic.Anthropic",
+    model: str = CLAUDE_MODEL,
+    preassigned: Optional[Dict[str, str]] = None
 ) -> CategorizationResult:
-    """Categorize items in an Amazon order using Claude."""
+    """Categorize items in an Amazon order using Claude.
+
+    preassigned maps item titles to category names known from elsewhere
+    (e.g. learned rules); those items skip Claude but aren't cached.
+    """
 
     # Check cache for all items - store full AmazonItem objects
     items_to_categorize = []
     cached_assignments = {}  # category -> list of AmazonItem
+    preassigned = preassigned or {}
 
     for item in order.items:
-        cached_cat = get_cached_category(item.title)
+        cached_cat = get_cached_category(item.title) or preassigned.get(item.title)
         if cached_cat:
             if cached_cat not in cached_assignments:
                 cached_assignments[cached_cat] = []
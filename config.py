@@ -3,3 +3,19 @@
 # Claude model for categorization and parsing
 # Claude Haiku 4.5 - fast and cost-effective
 CLAUDE_MODEL = "claude-haiku-4-5-20251001"
+
+# Days a cached Claude response stays valid (see utils.get_cached_response)
+LLM_CACHE_TTL_DAYS = 30
+
+# Amazon order history exports read by the itemize scripts
+AMAZON_RETAIL_ORDER_FILES = [
+    "data/amazon/order history crs/Retail.OrderHistory.1/Retail.OrderHistory.1.csv",
+    "data/amazon/order history crs/Retail.OrderHistory.2/Retail.OrderHistory.2.csv",
+    "data/amazon/order history jss/Retail.OrderHistory.1/Retail.OrderHistory.1.csv",
+]
+
+# Digital order files (D01 orders)
+AMAZON_DIGITAL_ORDER_FILES = [
+    "data/amazon/order history crs/Digital-Ordering.1/Digital Items.csv",
+    "data/amazon/order history jss/Digital-Ordering.1/Digital Items.csv",
+]
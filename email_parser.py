@@ -5,12 +5,15 @@ import json
 from dataclasses import dataclass
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Optional
-
-import anthropic
+from typing import TYPE_CHECKING, List, Optional
 
 from config import CLAUDE_MODEL
-from email_fetcher import RawEmail
+
+if TYPE_CHECKING:
+    # Type-only: importing these at runtime pulls in the Anthropic and Google
+    # API client libraries, which dominates Cloud Function cold start
+    import anthropic
+    from email_fetcher import RawEmail
 
 
 @dataclass
@@ -81,7 +84,7 @@ Email content:
 class AmazonEmailParser:
     """Parse Amazon order confirmation emails using Claude."""
 
-    def __init__(self, client: Optional[anthropic.Anthropic] = None):
+    def __init__(self, client: Optional["anthropic.Anthropic"] = None):
         """Initialize parser with optional Anthropic client."""
         self.client = client
 
@@ -137,6 +140,8 @@ class AmazonEmailParser:
         if not self.client:
             return None
 
+        import anthropic
+
         # Truncate content aggressively to reduce tokens (keep first 3000 chars)
         if len(content) > 3000:
             content = content[:3000] + "\n...[truncated]"
@@ -212,7 +217,7 @@ class AmazonEmailParser:
             "items": [{"title": item_name, "price": total, "quantity": 1}]
         }
 
-    def parse_email(self, email: RawEmail) -> Optional[ParsedOrder]:
+    def parse_email(self, email: "RawEmail") -> Optional[ParsedOrder]:
         """
         Parse an Amazon order email using Claude.
 
@@ -280,8 +285,8 @@ class AmazonEmailParser:
 
 
 def parse_amazon_emails(
-    emails: List[RawEmail],
-    client: Optional[anthropic.Anthropic] = None
+    emails: List["RawEmail"],
+    client: Optional["anthropic.Anthropic"] = None
 ) -> List[ParsedOrder]:
     """Parse a list of Amazon emails into orders."""
     parser = AmazonEmailParser(client=client)
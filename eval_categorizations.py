@@ -25,6 +25,9 @@ from dotenv import load_dotenv
 
 load_dotenv()
 
+# Emoji at start of a category name (common emoji ranges) plus trailing whitespace
+LEADING_EMOJI_PATTERN = re.compile(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*')
+
 
 # =============================================================================
 # KEYWORD RULES - Items containing these keywords should map to these categories
@@ -402,12 +405,12 @@ def check_keyword_rules(item: str, category: str) -> list[str]:
     issues = []
 
     # Strip emoji from category for comparison
-    cat_stripped = re.sub(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*', '', category)
+    cat_stripped = LEADING_EMOJI_PATTERN.sub('', category)
 
     # Check if item matches a known brand - if so, trust the brand's category
     brand_cat = get_brand_category(item)
     if brand_cat:
-        brand_cat_stripped = re.sub(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*', '', brand_cat)
+        brand_cat_stripped = LEADING_EMOJI_PATTERN.sub('', brand_cat)
         # If categorized correctly for the brand, skip all keyword checks
         if cat_stripped.lower() == brand_cat_stripped.lower():
             return []
@@ -428,7 +431,7 @@ def check_keyword_rules(item: str, category: str) -> list[str]:
                 if brand_cat:
                     continue
 
-                expected_stripped = re.sub(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*', '', expected_cat)
+                expected_stripped = LEADING_EMOJI_PATTERN.sub('', expected_cat)
 
                 # Check if category matches expected (including subcategories like "Fruit (avocado)")
                 cat_matches = (
@@ -468,7 +471,7 @@ def check_keyword_rules(item: str, category: str) -> list[str]:
 
     # Check negative rules - if item contains keyword, should NOT be in that category
     for forbidden_cat, keywords in NEGATIVE_RULES.items():
-        cat_stripped = re.sub(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*', '', category)
+        cat_stripped = LEADING_EMOJI_PATTERN.sub('', category)
         if cat_stripped.lower() == forbidden_cat.lower():
             for keyword in keywords:
                 if word_boundary_match(keyword, item):
@@ -504,8 +507,8 @@ def evaluate_golden_set(category_cache: dict, golden_set: list[dict]) -> dict:
         else:
             actual = category_cache[key]
             # Strip emoji for comparison
-            actual_stripped = re.sub(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*', '', actual)
-            expected_stripped = re.sub(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*', '', expected)
+            actual_stripped = LEADING_EMOJI_PATTERN.sub('', actual)
+            expected_stripped = LEADING_EMOJI_PATTERN.sub('', expected)
 
             if actual_stripped.lower() == expected_stripped.lower():
                 results["matched"] += 1
@@ -7,8 +7,11 @@ IMPORTANT: Importing from this module indicates destructive intent and
 will trigger permission prompts via the auto_approve_reads hook.
 """
 
+import atexit
 import csv
 import json
+import pickle
+import threading
 from datetime import datetime
 from pathlib import Path
 from typing import Dict, List, Optional
@@ -22,8 +25,32 @@ def save_cache(cache_file: Path, data: dict) -> None:
         data: Cache data to save
     """
     cache_file.parent.mkdir(parents=True, exist_ok=True)
+    # Compact output: these caches are machine-read and can hold every transaction
     with open(cache_file, "w") as f:
-        json.dump(data, f, indent=2, default=str)
+        json.dump(data, f, separators=(",", ":"), default=str)
+
+
+def save_pickle_cache(cache_file: Path, data) -> None:
+    """Save parsed data to a pickle cache file.
+
+    Args:
+        cache_file: Path to the cache file
+        data: Picklable data to save
+    """
+    cache_file.parent.mkdir(parents=True, exist_ok=True)
+    with open(cache_file, "wb") as f:
+        pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+
+
+def save_keyed_pickle_cache(cache_file: Path, key: str, data) -> None:
+    """Save data with the key it was built from, overwriting any previous cache.
+
+    Args:
+        cache_file: Fixed path of the cache file
+        key: Identifies the inputs (e.g. a hash of source files)
+        data: Picklable data to save
+    """
+    save_pickle_cache(cache_file, {"key": key, "data": data})
 
 
 def save_pending_batches(cache_dir: Path, data: dict) -> None:
@@ -55,13 +82,54 @@ def save_category_cache(cache_file: Path, cache_data: dict, dirty: bool = True)
     try:
         cache_file.parent.mkdir(parents=True, exist_ok=True)
         with open(cache_file, "w") as f:
-            json.dump(cache_data, f, indent=2)
+            json.dump(cache_data, f, separators=(",", ":"))
         return True
     except IOError as e:
         print(f"Warning: Could not save category cache: {e}")
         return False
 
 
+def save_response_cache(cache_file: Path, cache_data: dict) -> bool:
+    """Save the Claude response cache to disk.
+
+    Args:
+        cache_file: Path to the cache file
+        cache_data: Dictionary mapping request hashes to cached responses
+
+    Returns:
+        True if saved, False on error
+    """
+    try:
+        cache_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(cache_file, "w") as f:
+            json.dump(cache_data, f, separators=(",", ":"))
+        return True
+    except IOError as e:
+        print(f"Warning: Could not save response cache: {e}")
+        return False
+
+
+# Buffered miscategorization log lines per log file, flushed in batches
+MISCATEGORIZATION_FLUSH_SIZE = 100
+_miscategorization_buffer: Dict[Path, List[str]] = {}
+_miscategorization_lock = threading.Lock()
+
+
+def flush_miscategorization_log() -> None:
+    """Write any buffered miscategorization entries to their log files."""
+    with _miscategorization_lock:
+        pending = dict(_miscategorization_buffer)
+        _miscategorization_buffer.clear()
+
+    for log_file, lines in pending.items():
+        log_file.parent.mkdir(parents=True, exist_ok=True)
+        with open(log_file, "a") as f:
+            f.write("".join(lines))
+
+
+atexit.register(flush_miscategorization_log)
+
+
 def log_miscategorization(
     item: str,
     original_category: str,
@@ -79,27 +147,24 @@ def log_miscategorization(
     if cache_dir is None:
         cache_dir = Path("data/processed/chase-amazon")
 
-    log_file = cache_dir / "miscategorization_log.json"
+    # JSON Lines: one entry per line, appended without rereading the log
+    log_file = cache_dir / "miscategorization_log.jsonl"
 
-    # Load existing log
-    if log_file.exists():
-        with open(log_file, "r") as f:
-            log_data = json.load(f)
-    else:
-        log_data = {"runs": [], "items": []}
-
-    # Add this miscategorization
     entry = {
         "timestamp": datetime.now().isoformat(),
         "item": item[:100],  # Truncate long names
         "original_category": original_category,
         "corrected_category": new_category,
     }
-    log_data["items"].append(entry)
 
-    # Save
-    with open(log_file, "w") as f:
-        json.dump(log_data, f, indent=2)
+    # Buffered; written every MISCATEGORIZATION_FLUSH_SIZE entries and at exit
+    with _miscategorization_lock:
+        lines = _miscategorization_buffer.setdefault(log_file, [])
+        lines.append(json.dumps(entry) + "\n")
+        should_flush = len(lines) >= MISCATEGORIZATION_FLUSH_SIZE
+
+    if should_flush:
+        flush_miscategorization_log()
 
 
 def save_csv_report(
@@ -4,8 +4,10 @@ import os
 import json
 import re
 import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from dotenv import load_dotenv
 import anthropic
+from utils import get_transactions_cached, log_progress
 from ynab_client import YNABClient
 
 load_dotenv()
@@ -45,19 +47,23 @@ def categorize_with_claude(items, categories, client):
     items_str = "\n".join([f"- {item}" for item in items])
     cat_str = ", ".join(categories[:50])
 
+    # Category list is identical across batches - cache it as a system block
     response = client.messages.create(
         model="claude-sonnet-4-20250514",
         max_tokens=2048,
-        messages=[{
-            "role": "user",
-            "content": f"""Categorize these Amazon purchase items into budget categories. Return JSON only.
-
-Items:
-{items_str}
+        system=[{
+            "type": "text",
+            "text": f"""Categorize Amazon purchase items into budget categories. Return JSON only.
 
 Categories: {cat_str}
 
-Return: {{"items": [{{"item": "item text", "category": "category name"}}]}}"""
+Return: {{"items": [{{"item": "item text", "category": "category name"}}]}}""",
+            "cache_control": {"type": "ephemeral"}
+        }],
+        messages=[{
+            "role": "user",
+            "content": f"""Items:
+{items_str}"""
         }]
     )
 
@@ -90,7 +96,7 @@ def main():
     cat_lookup_lower = {c.name.lower(): c.category_id for c in categories}
 
     print("Fetching transactions...")
-    transactions = ynab.get_transactions(budget_id, account_id, since_date='2020-01-01')
+    transactions = get_transactions_cached(ynab, budget_id, account_id, since_date='2020-01-01')
 
     # Find uncategorized Amazon transactions with splits
     to_fix = []
@@ -134,11 +140,22 @@ def main():
 
     if items_for_claude:
         batch_size = 20
-        for i in range(0, len(items_for_claude), batch_size):
-            batch = items_for_claude[i:i+batch_size]
-            print(f"Categorizing batch {i//batch_size + 1}...")
-            try:
-                result = categorize_with_claude(batch, cat_names, claude)
+        batches = [items_for_claude[i:i+batch_size] for i in range(0, len(items_for_claude), batch_size)]
+        print(f"Categorizing {len(batches)} batches...")
+
+        # Batches are independent, so send a few at a time
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            futures = {
+                executor.submit(categorize_with_claude, batch, cat_names, claude): batch
+                for batch in batches
+            }
+            for future in as_completed(futures):
+                batch = futures[future]
+                try:
+                    result = future.result()
+                except Exception as e:
+                    print(f"  Error: {e}")
+                    continue
                 for item_data in result.get('items', []):
                     item = item_data.get('item', '')
                     cat = item_data.get('category', '')
@@ -146,14 +163,12 @@ def main():
                         if orig_item.startswith(item[:30]) or item.startswith(orig_item[:30]):
                             item_categories[orig_item] = cat
                             break
-            except Exception as e:
-                print(f"  Error: {e}")
 
     print(f"\nRecreating {len(to_fix)} transactions...")
     fixed = 0
     errors = 0
 
-    for t in to_fix:
+    for i, t in enumerate(to_fix, 1):
         # Build new subtransactions with categories
         new_subs = []
         for sub in t.subtransactions:
@@ -181,7 +196,7 @@ def main():
             # Create new one
             new_txn = {
                 'account_id': account_id,
-                'date': t.date.strftime('%Y-%m-%d'),
+                'date': t.date.date().isoformat(),
                 'amount': int(t.amount * 1000),
                 'payee_name': 'Amazon.com',
                 'memo': t.memo,
@@ -189,12 +204,12 @@ def main():
                 'subtransactions': new_subs
             }
             ynab.create_transactions_batch(budget_id, [new_txn])
-            print(f"  Fixed {t.date.strftime('%Y-%m-%d')} {t.memo[:40]}")
             fixed += 1
             time.sleep(0.3)
         except Exception as e:
             print(f"  Error {t.transaction_id}: {e}")
             errors += 1
+        log_progress(i, len(to_fix), "Processed")
 
     print(f"\nDone! Fixed: {fixed}, Errors: {errors}")
 
@@ -4,62 +4,87 @@ import csv
 import os
 import re
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
+from typing import List, Tuple
 from dotenv import load_dotenv
+from config import AMAZON_DIGITAL_ORDER_FILES, AMAZON_RETAIL_ORDER_FILES
+from file_writer import save_keyed_pickle_cache
+from utils import get_cache_dir, get_transactions_cached, hash_files, load_keyed_pickle_cache, log_progress
 from ynab_client import YNABClient
 
 load_dotenv()
 
 
-def load_order_history():
-    """Load all order history CSVs and build order_id -> product names mapping."""
-    orders = defaultdict(list)
+def _shorten_product(product: str) -> str:
+    """Shorten product name for memo."""
+    return product[:50] + '...' if len(product) > 50 else product
 
-    # Retail order history files
-    retail_files = [
-        "data/amazon/order history crs/Retail.OrderHistory.1/Retail.OrderHistory.1.csv",
-        "data/amazon/order history crs/Retail.OrderHistory.2/Retail.OrderHistory.2.csv",
-        "data/amazon/order history jss/Retail.OrderHistory.1/Retail.OrderHistory.1.csv",
-    ]
 
-    for filepath in retail_files:
-        if not os.path.exists(filepath):
-            print(f"  Skipping {filepath} (not found)")
-            continue
+def _parse_order_file(filepath: str, id_column: str, product_column: str) -> List[Tuple[str, str]]:
+    """Parse one order CSV into rows of (order_id, short_product).
 
-        print(f"  Loading {filepath}")
-        with open(filepath, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                order_id = row.get('Order ID', '').strip()
-                product = row.get('Product Name', '').strip()
-                if order_id and product and product != 'Not Available':
-                    # Shorten product name for memo
-                    short_product = product[:50] + '...' if len(product) > 50 else product
-                    orders[order_id].append(short_product)
-
-    # Digital order files (D01 orders)
-    digital_files = [
-        "data/amazon/order history crs/Digital-Ordering.1/Digital Items.csv",
-        "data/amazon/order history jss/Digital-Ordering.1/Digital Items.csv",
-    ]
-
-    for filepath in digital_files:
-        if not os.path.exists(filepath):
-            print(f"  Skipping {filepath} (not found)")
-            continue
+    Module-level so it can run in a worker process.
+    """
+    rows = []
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            order_id = row.get(id_column, '').strip()
+            product = row.get(product_column, '').strip()
+            if order_id and product and product != 'Not Available':
+                rows.append((order_id, _shorten_product(product)))
+    return rows
+
+
+def load_order_history():
+    """Load all order history CSVs and build order_id -> product names mapping.
+
+    Parsed results are cached on disk, keyed by a hash of the CSV contents.
+    """
+    cache_file = get_cache_dir() / "reconciliation_order_history.pkl"
+    cache_key = hash_files(AMAZON_RETAIL_ORDER_FILES + AMAZON_DIGITAL_ORDER_FILES)
+    cached = load_keyed_pickle_cache(cache_file, cache_key)
+    if cached is not None:
+        print(f"  Loaded {len(cached)} unique orders (cached)")
+        return cached
+
+    retail_files = []
+    digital_files = []
+    for files, found in [(AMAZON_RETAIL_ORDER_FILES, retail_files), (AMAZON_DIGITAL_ORDER_FILES, digital_files)]:
+        for filepath in files:
+            if not os.path.exists(filepath):
+                print(f"  Skipping {filepath} (not found)")
+                continue
+            print(f"  Loading {filepath}")
+            found.append(filepath)
+
+    # Each CSV parse is CPU-bound, so parse files in parallel processes
+    with ProcessPoolExecutor(max_workers=max(len(retail_files) + len(digital_files), 1)) as executor:
+        retail_results = executor.map(
+            _parse_order_file, retail_files,
+            repeat('Order ID'), repeat('Product Name')
+        )
+        digital_results = executor.map(
+            _parse_order_file, digital_files,
+            repeat('OrderId'), repeat('ProductName')
+        )
+        retail_results = list(retail_results)
+        digital_results = list(digital_results)
+
+    orders = defaultdict(list)
+
+    for rows in retail_results:
+        for order_id, short_product in rows:
+            orders[order_id].append(short_product)
 
-        print(f"  Loading {filepath}")
-        with open(filepath, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                order_id = row.get('OrderId', '').strip()
-                product = row.get('ProductName', '').strip()
-                if order_id and product and product != 'Not Available':
-                    short_product = product[:50] + '...' if len(product) > 50 else product
-                    if short_product not in orders[order_id]:
-                        orders[order_id].append(short_product)
+    for rows in digital_results:
+        for order_id, short_product in rows:
+            if short_product not in orders[order_id]:
+                orders[order_id].append(short_product)
 
     print(f"  Loaded {len(orders)} unique orders")
+    save_keyed_pickle_cache(cache_file, cache_key, orders)
     return orders
 
 
@@ -86,7 +111,7 @@ def main():
     orders = load_order_history()
 
     print("\nFetching YNAB transactions...")
-    transactions = client.get_transactions(budget_id, account_id, since_date="2020-01-01")
+    transactions = get_transactions_cached(client, budget_id, account_id, since_date="2020-01-01")
 
     # Find reconciliation transactions
     recon_txns = []
@@ -119,7 +144,7 @@ def main():
         if len(new_memo) > 200:
             new_memo = new_memo[:197] + "..."
 
-        print(f"  {t.date.strftime('%Y-%m-%d')} ${abs(t.amount):.2f}")
+        print(f"  {t.date.date().isoformat()} ${abs(t.amount):.2f}")
         print(f"    OLD: {t.memo}")
         print(f"    NEW: {new_memo}")
 
@@ -134,9 +159,9 @@ def main():
 
     print(f"\n{len(updates)} transactions to update...")
     print("\nUpdating transactions...")
-    for u in updates:
+    for i, u in enumerate(updates, 1):
         client.update_transaction(budget_id, u['id'], memo=u['memo'])
-        print(f"  Updated {u['id'][:8]}...")
+        log_progress(i, len(updates), "Updated")
 
     print("Done!")
 
@@ -4,93 +4,160 @@ import csv
 import os
 import re
 from collections import defaultdict
-from decimal import Decimal, ROUND_HALF_UP
+from concurrent.futures import ProcessPoolExecutor
+from decimal import Decimal
+from typing import List, Set, Tuple
 from dotenv import load_dotenv
+from config import AMAZON_DIGITAL_ORDER_FILES, AMAZON_RETAIL_ORDER_FILES
+from file_writer import save_keyed_pickle_cache
+from utils import get_cache_dir, hash_files, load_keyed_pickle_cache, log_progress
 from ynab_client import YNABClient
 
 load_dotenv()
 
+# Amazon retail and digital order numbers
+ORDER_NUMBER_PATTERN = re.compile(r'(11[1-4]-\d{7}-\d{7}|D01-\d{7}-\d{7})')
+
+# Bump when the load_order_items cache format changes
+ORDER_CACHE_VERSION = 2
+
+
+def _parse_price(price_str: str) -> Decimal:
+    """Parse a CSV price field, treating blanks and junk as zero."""
+    try:
+        return Decimal(price_str) if price_str else Decimal('0')
+    except:
+        return Decimal('0')
 
-def load_order_items():
-    """Load order items with prices. Returns order_id -> list of (product, price).
 
-    Also returns grocery_orders set for orders that shouldn't be itemized.
+def _parse_retail_file(filepath: str) -> Tuple[List[Tuple[str, str, Decimal]], Set[str]]:
+    """Parse one retail order history CSV.
+
+    Returns (rows of (order_id, product, price), grocery order IDs).
+    Module-level so it can run in a worker process.
     """
-    orders = defaultdict(list)
+    rows = []
     grocery_orders = set()
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            order_id = row.get('Order ID', '').strip()
+            product = row.get('Product Name', '').strip()
+            shipping = row.get('Shipping Option', '').lower()
 
-    # Retail order history files
-    retail_files = [
-        "data/amazon/order history crs/Retail.OrderHistory.1/Retail.OrderHistory.1.csv",
-        "data/amazon/order history crs/Retail.OrderHistory.2/Retail.OrderHistory.2.csv",
-        "data/amazon/order history jss/Retail.OrderHistory.1/Retail.OrderHistory.1.csv",
-    ]
+            # Mark grocery orders (Whole Foods, Amazon Fresh)
+            if 'houdini' in shipping or 'fresh' in shipping:
+                grocery_orders.add(order_id)
 
-    for filepath in retail_files:
-        if not os.path.exists(filepath):
-            continue
+            # Get price: Total Owed includes tax
+            price = _parse_price(row.get('Total Owed', '0').replace("'", "").strip())
 
-        print(f"  Loading {filepath}")
-        with open(filepath, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                order_id = row.get('Order ID', '').strip()
-                product = row.get('Product Name', '').strip()
-                shipping = row.get('Shipping Option', '').lower()
-
-                # Mark grocery orders (Whole Foods, Amazon Fresh)
-                if 'houdini' in shipping or 'fresh' in shipping:
-                    grocery_orders.add(order_id)
-
-                # Get price: Total Owed includes tax
-                price_str = row.get('Total Owed', '0').replace("'", "").strip()
-                try:
-                    price = Decimal(price_str) if price_str else Decimal('0')
-                except:
-                    price = Decimal('0')
-
-                if order_id and product and product != 'Not Available' and price > 0:
-                    orders[order_id].append((product, price))
-
-    # Digital order files
-    digital_files = [
-        "data/amazon/order history crs/Digital-Ordering.1/Digital Items.csv",
-        "data/amazon/order history jss/Digital-Ordering.1/Digital Items.csv",
-    ]
-
-    for filepath in digital_files:
-        if not os.path.exists(filepath):
-            continue
+            if order_id and product and product != 'Not Available' and price > 0:
+                rows.append((order_id, product, price))
+    return rows, grocery_orders
 
+
+def _parse_digital_file(filepath: str) -> List[Tuple[str, str, Decimal]]:
+    """Parse one digital order CSV into rows of (order_id, product, price)."""
+    rows = []
+    with open(filepath, 'r', encoding='utf-8-sig') as f:
+        reader = csv.DictReader(f)
+        for row in reader:
+            order_id = row.get('OrderId', '').strip()
+            product = row.get('ProductName', '').strip()
+            price = _parse_price(row.get('OurPrice', '0').strip())
+
+            if order_id and product and product != 'Not Available' and price > 0:
+                rows.append((order_id, product, price))
+    return rows
+
+
+def load_order_items():
+    """Load order items with prices. Returns order_id -> list of (product, price).
+
+    Also returns grocery_orders set for orders that shouldn't be itemized,
+    and order_totals mapping order_id -> sum of item prices.
+    Parsed results are cached on disk, keyed by a hash of the CSV contents.
+    """
+    cache_file = get_cache_dir() / "order_items.pkl"
+    cache_key = f"v{ORDER_CACHE_VERSION}-{hash_files(AMAZON_RETAIL_ORDER_FILES + AMAZON_DIGITAL_ORDER_FILES)}"
+    cached = load_keyed_pickle_cache(cache_file, cache_key)
+    if cached is not None:
+        orders, grocery_orders, order_totals = cached
+        print(f"  Loaded {len(orders)} unique orders with item details (cached)")
+        return orders, grocery_orders, order_totals
+
+    retail_files = [f for f in AMAZON_RETAIL_ORDER_FILES if os.path.exists(f)]
+    digital_files = [f for f in AMAZON_DIGITAL_ORDER_FILES if os.path.exists(f)]
+    for filepath in retail_files + digital_files:
         print(f"  Loading {filepath}")
-        with open(filepath, 'r', encoding='utf-8-sig') as f:
-            reader = csv.DictReader(f)
-            for row in reader:
-                order_id = row.get('OrderId', '').strip()
-                product = row.get('ProductName', '').strip()
-                price_str = row.get('OurPrice', '0').strip()
-
-                try:
-                    price = Decimal(price_str) if price_str else Decimal('0')
-                except:
-                    price = Decimal('0')
-
-                if order_id and product and product != 'Not Available' and price > 0:
-                    # Avoid duplicates
-                    existing = [p for p, _ in orders[order_id]]
-                    if product not in existing:
-                        orders[order_id].append((product, price))
+
+    # Each CSV parse is CPU-bound, so parse files in parallel processes
+    with ProcessPoolExecutor(max_workers=max(len(retail_files) + len(digital_files), 1)) as executor:
+        retail_results = executor.map(_parse_retail_file, retail_files)
+        digital_results = executor.map(_parse_digital_file, digital_files)
+        retail_results = list(retail_results)
+        digital_results = list(digital_results)
+
+    orders = defaultdict(list)
+    grocery_orders = set()
+    order_totals = defaultdict(Decimal)
+
+    for rows, file_grocery_orders in retail_results:
+        grocery_orders |= file_grocery_orders
+        for order_id, product, price in rows:
+            orders[order_id].append((product, price))
+            order_totals[order_id] += price
+
+    # Product names already recorded per order, for O(1) duplicate checks
+    seen = defaultdict(set)
+    for order_id, items in orders.items():
+        seen[order_id].update(product for product, _ in items)
+
+    for rows in digital_results:
+        for order_id, product, price in rows:
+            # Avoid duplicates
+            if product not in seen[order_id]:
+                seen[order_id].add(product)
+                orders[order_id].append((product, price))
+                order_totals[order_id] += price
 
     print(f"  Loaded {len(orders)} unique orders with item details")
     print(f"  Identified {len(grocery_orders)} grocery orders (Whole Foods/Fresh)")
-    return orders, grocery_orders
+    save_keyed_pickle_cache(cache_file, cache_key, (orders, grocery_orders, order_totals))
+    return orders, grocery_orders, order_totals
+
+
+def allocate_milliunits(total: int, weights: List[int]) -> List[int]:
+    """Split total milliunits across weights proportionally, rounded to the cent.
+
+    Works in integers throughout. The last share absorbs any rounding
+    remainder so the parts always sum exactly to total.
+    """
+    weight_total = sum(weights)
+    sign = -1 if total < 0 else 1
+    total_cents = abs(total) // 10
+
+    amounts = []
+    allocated = 0
+    for weight in weights[:-1]:
+        if weight_total > 0:
+            # Round half up: floor((2 * a * w + W) / (2 * W))
+            cents = (2 * total_cents * weight + weight_total) // (2 * weight_total)
+            share = sign * cents * 10
+        else:
+            share = 0
+        amounts.append(share)
+        allocated += share
+    amounts.append(total - allocated)
+    return amounts
 
 
 def extract_order_number(memo):
     """Extract order number from memo."""
     if not memo:
         return None
-    match = re.search(r'(11[1-4]-\d{7}-\d{7}|D01-\d{7}-\d{7})', memo)
+    match = ORDER_NUMBER_PATTERN.search(memo)
     return match.group(1) if match else None
 
 
@@ -105,27 +172,33 @@ def main():
     account_id = "60e777c8-1a41-48af-8a35-b6dbb1807946"
 
     print("Loading order items with prices...")
-    orders, grocery_orders = load_order_items()
+    orders, grocery_orders, order_totals = load_order_items()
 
     print("\nFetching YNAB transactions...")
-    transactions = client.get_transactions(budget_id, account_id, since_date="2020-01-01")
+    # Only uncategorized rows can need itemizing, so let YNAB filter them
+    transactions = client.get_transactions(
+        budget_id, account_id, since_date="2020-01-01", transaction_type="uncategorized"
+    )
 
     # Find uncategorized transactions that have order numbers but no subtransactions
     # These are reconciliation charges that need itemization
     recon_txns = []
+    # Cheapest rejections first; the regex only runs on plausible memos
     for t in transactions:
-        memo = t.memo or ""
-        order_num = extract_order_number(memo)
-
-        if not order_num:
-            continue
-
         # Only process uncategorized transactions
         if t.category_id is not None and t.category_name != "Uncategorized":
             continue
 
         # Skip if already has subtransactions (already itemized)
-        if t.subtransactions and len(t.subtransactions) > 0:
+        if t.subtransactions:
+            continue
+
+        # Order numbers always contain dashes
+        if not t.memo or '-' not in t.memo:
+            continue
+
+        order_num = extract_order_number(t.memo)
+        if not order_num:
             continue
 
         # Only include orders we have item data for
@@ -162,13 +235,13 @@ def main():
             continue
 
         # Check if items total approximately matches transaction
-        items_total = sum(price for _, price in items)
+        items_total = order_totals[order_num]
         diff = abs(items_total - txn_abs)
         if diff > Decimal('5.00') and diff / txn_abs > Decimal('0.1'):
             # Amount mismatch - still create split with single line using transaction amount
             print(f"  INFO: Amount mismatch ${txn_abs} vs items ${items_total} for {order_num} - using single split")
 
-        print(f"\n  {t.date.strftime('%Y-%m-%d')} ${txn_abs:.2f} - Order {order_num}")
+        print(f"\n  {t.date.date().isoformat()} ${txn_abs:.2f} - Order {order_num}")
 
         # Build splits
         splits = []
@@ -193,21 +266,13 @@ def main():
         else:
             # Multiple items - proportionally distribute
             print(f"    {len(items)} items:")
-            running_total = Decimal('0')
-
-            for i, (product, price) in enumerate(items):
-                if i == len(items) - 1:
-                    # Last item gets remainder to ensure exact total
-                    item_amount = txn_amount - running_total
-                else:
-                    # Proportional allocation
-                    if items_total > 0:
-                        ratio = price / items_total
-                        item_amount = (txn_amount * ratio).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
-                    else:
-                        item_amount = Decimal('0')
-                    running_total += item_amount
+            item_amounts = allocate_milliunits(
+                int(txn_amount * 1000),
+                [int(price * 1000) for _, price in items]
+            )
 
+            for (product, _), item_milli in zip(items, item_amounts):
+                item_amount = Decimal(item_milli) / 1000
                 splits.append({
                     "amount": item_amount,
                     "category_id": None,
@@ -228,7 +293,8 @@ def main():
     print(f"\n{len(updates)} transactions to split into itemized line items...")
     print("\nUpdating transactions...")
 
-    for u in updates:
+    split_count = 0
+    for i, u in enumerate(updates, 1):
         t = u['transaction']
         splits = u['splits']
 
@@ -241,11 +307,12 @@ def main():
                 memo=f"Order {u['order_num']}",
                 approved=False
             )
-            print(f"  Split {t.transaction_id[:8]}... into {len(splits)} items")
+            split_count += 1
         except Exception as e:
             print(f"  ERROR splitting {t.transaction_id[:8]}: {e}")
+        log_progress(i, len(updates), "Processed")
 
-    print("\nDone!")
+    print(f"\nDone! Split {split_count}/{len(updates)} transactions")
 
 
 if __name__ == '__main__':
@@ -4,28 +4,75 @@ import base64
 import json
 import os
 import re
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timedelta
 from decimal import Decimal
-from typing import Optional
+from email.utils import parsedate_to_datetime
+from html.parser import HTMLParser
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo
 
-import anthropic
 import functions_framework
 from cloudevents.http import CloudEvent
-from google.cloud import secretmanager
-from google.oauth2.credentials import Credentials
-from googleapiclient.discovery import build
+from dateutil import parser as date_parser
 
 from amazon_parser import AmazonOrder, AmazonItem
 from categorizer import categorize_order, categorize_simple, CategorizationResult
+from config import CLAUDE_MODEL
 from email_parser import AmazonEmailParser, ParsedOrder
 from email_sender import send_summary_email, send_clarification_email, send_correction_confirmation_email
 # Storage no longer needed - using YNAB memo for deduplication
-from ynab_client import YNABClient
+from ynab_client import YNABClient, YNABTransaction
+from utils import get_cached_category
 from ynab_writer import YNABWriter
 
+try:
+    from config_private import RECEIPTS_EMAIL
+except ImportError:
+    RECEIPTS_EMAIL = None  # No receipts email configured
+RECEIPTS_EMAIL_LOWER = RECEIPTS_EMAIL.lower() if RECEIPTS_EMAIL else ""
+
 # Cache for secrets and services
 _secrets_cache = {}
+_secret_client = None
 _gmail_service = None
+_gmail_credentials = None
+_thread_local = threading.local()
+_firestore_client = None
+_ynab_client = None
+_ynab_writer = None
+_anthropic_client = None
+
+# Concurrent email pipelines per push notification
+PUSH_EMAIL_WORKERS = 5
+
+# Secrets touched by a typical invocation, fetched together at cold start
+_REQUIRED_SECRETS = (
+    "gmail-oauth-token",
+    "ynab-token",
+    "ynab-budget-name",
+    "anthropic-api-key",
+    "ynab-amazon-account",
+)
+
+
+def get_secret_client():
+    """Get the Secret Manager client, created once per instance."""
+    global _secret_client
+    if _secret_client is None:
+        from google.cloud import secretmanager
+        _secret_client = secretmanager.SecretManagerServiceClient()
+    return _secret_client
+
+
+def _access_secret(secret_id: str) -> str:
+    """Fetch the latest version of a secret, bypassing the cache."""
+    project_id = os.getenv("GCP_PROJECT_ID")
+    name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
+    response = get_secret_client().access_secret_version(request={"name": name})
+    return response.payload.data.decode("UTF-8")
 
 
 def get_secret(secret_id: str) -> str:
@@ -33,22 +80,51 @@ def get_secret(secret_id: str) -> str:
     if secret_id in _secrets_cache:
         return _secrets_cache[secret_id]
 
-    project_id = os.getenv("GCP_PROJECT_ID")
-    client = secretmanager.SecretManagerServiceClient()
-    name = f"projects/{project_id}/secrets/{secret_id}/versions/latest"
-    response = client.access_secret_version(request={"name": name})
-    secret_value = response.payload.data.decode("UTF-8")
+    secret_value = _access_secret(secret_id)
     _secrets_cache[secret_id] = secret_value
     return secret_value
 
 
+def prefetch_secrets(secret_ids=_REQUIRED_SECRETS) -> None:
+    """
+    Fetch uncached secrets concurrently so cold starts pay for one round trip
+    instead of one per secret. Failures are left for get_secret to raise.
+    """
+    missing = [s for s in secret_ids if s not in _secrets_cache]
+    if not missing:
+        return
+
+    def fetch(secret_id):
+        try:
+            return secret_id, _access_secret(secret_id)
+        except Exception as e:
+            print(f"Could not prefetch secret {secret_id}: {e}")
+            return secret_id, None
+
+    with ThreadPoolExecutor(max_workers=len(missing)) as executor:
+        for secret_id, value in executor.map(fetch, missing):
+            if value is not None:
+                _secrets_cache[secret_id] = value
+
+
+def get_firestore_client():
+    """Get the Firestore client, created once per instance."""
+    global _firestore_client
+    if _firestore_client is None:
+        from google.cloud import firestore
+        _firestore_client = firestore.Client(project=os.getenv("GCP_PROJECT_ID"))
+    return _firestore_client
+
+
 def get_gmail_service():
     """Get authenticated Gmail API service."""
-    global _gmail_service
+    global _gmail_service, _gmail_credentials
     if _gmail_service:
         return _gmail_service
 
     from google.auth.transport.requests import Request
+    from google.oauth2.credentials import Credentials
+    from googleapiclient.discovery import build
 
     # Get OAuth token from Secret Manager
     token_json = get_secret("gmail-oauth-token")
@@ -72,20 +148,51 @@ def get_gmail_service():
         creds.refresh(Request())
         print("Token refreshed successfully")
 
+    _gmail_credentials = creds
     _gmail_service = build("gmail", "v1", credentials=creds)
     return _gmail_service
 
 
+def get_thread_gmail_service():
+    """Get a Gmail service for the current worker thread.
+
+    googleapiclient services share an httplib2 connection that is not
+    thread-safe, so each worker builds its own from the shared credentials.
+    """
+    service = getattr(_thread_local, "gmail_service", None)
+    if service is None:
+        from googleapiclient.discovery import build
+
+        get_gmail_service()  # Loads and refreshes _gmail_credentials
+        service = build("gmail", "v1", credentials=_gmail_credentials)
+        _thread_local.gmail_service = service
+    return service
+
+
 def get_ynab_client() -> YNABClient:
-    """Get YNAB client with credentials from Secret Manager."""
-    token = get_secret("ynab-token")
-    return YNABClient(token)
+    """Get YNAB client with credentials from Secret Manager (cached per instance)."""
+    global _ynab_client
+    if _ynab_client is None:
+        _ynab_client = YNABClient(get_secret("ynab-token"))
+    return _ynab_client
+
+
+def get_ynab_writer() -> YNABWriter:
+    """Get YNAB writer sharing the cached client's HTTP session."""
+    global _ynab_writer
+    if _ynab_writer is None:
+        _ynab_writer = YNABWriter(get_ynab_client())
+    return _ynab_writer
+
 
+def get_anthropic_client():
+    """Get Anthropic client with credentials from Secret Manager (cached per instance)."""
+    global _anthropic_client
+    if _anthropic_client is None:
+        import anthropic
 
-def get_anthropic_client() -> anthropic.Anthropic:
-    """Get Anthropic client with credentials from Secret Manager."""
-    api_key = get_secret("anthropic-api-key")
-    return anthropic.Anthropic(api_key=api_key)
+        _anthropic_client = anthropic.Anthropic(api_key=get_secret("anthropic-api-key"))
+    return _anthropic_client
 
 
 def get_budget_name() -> str:
@@ -100,43 +207,226 @@ AMAZON_PAYEES = [
 ]
 
 GROCERY_PAYEES = ["amazon fresh", "whole foods", "whole foods market"]
+GROCERY_PATTERN = re.compile("|".join(re.escape(p) for p in GROCERY_PAYEES), re.IGNORECASE)
+
+EASTERN_TZ = ZoneInfo("America/New_York")
 
 # Flag colors for transactions
 FLAG_CREATED = "yellow"  # Auto-created from email (no bank match)
 FLAG_MATCHED = "orange"  # Matched existing bank transaction
 
+# Category groups never offered for categorization
+EXCLUDED_CATEGORY_GROUPS = ['library renovation']
+
+# Skip revalidating the category index if it was checked this recently, so
+# a burst of emails shares one check
+CATEGORY_REVALIDATE_SECONDS = 60
+
+# budget_id -> (server_knowledge, checked_at, categories, cat_lookup, cat_id_to_name)
+_categories_cache = {}
+_categories_lock = threading.Lock()
+
+
+def get_category_index(ynab: YNABClient, budget_id: str) -> tuple:
+    """Get usable categories plus name/ID lookups, cached per warm instance.
+
+    Revalidates with YNAB's delta endpoint (at most every
+    CATEGORY_REVALIDATE_SECONDS): an empty delta means the cached index is
+    current, otherwise it is rebuilt from a full fetch.
+
+    Returns:
+        (categories, cat_lookup, cat_id_to_name) where cat_lookup maps
+        lowercased name -> category ID
+    """
+    # Push workers share the cache; one revalidates while the others wait
+    with _categories_lock:
+        cached = _categories_cache.get(budget_id)
+        if cached:
+            if time.monotonic() - cached[1] < CATEGORY_REVALIDATE_SECONDS:
+                return cached[2:]
+            changed_groups, _ = ynab.get_category_groups(budget_id, last_knowledge_of_server=cached[0])
+            if not changed_groups:
+                _categories_cache[budget_id] = (cached[0], time.monotonic()) + cached[2:]
+                return cached[2:]
+
+        category_groups, server_knowledge = ynab.get_category_groups(budget_id)
+        categories = [
+            c for c in YNABClient.categories_from_groups(category_groups)
+            if c.group_name.lower() not in EXCLUDED_CATEGORY_GROUPS
+        ]
+        cat_lookup = {c.name.lower(): c.category_id for c in categories}
+        cat_id_to_name = {c.category_id: c.name for c in categories}
+        _categories_cache[budget_id] = (
+            server_knowledge, time.monotonic(), categories, cat_lookup, cat_id_to_name
+        )
+        return categories, cat_lookup, cat_id_to_name
+
+
+# Per-instance memo of slow-changing YNAB lookups
+_default_account_cache = {}
+_budget_id_cache = {}
+
+
+def get_budget_id(ynab: YNABClient, budget_name: str) -> Optional[str]:
+    """Get budget ID by name, memoized per warm instance."""
+    if budget_name not in _budget_id_cache:
+        budget_id = ynab.get_budget_id(budget_name)
+        if not budget_id:
+            return None
+        _budget_id_cache[budget_name] = budget_id
+    return _budget_id_cache[budget_name]
+
 
 def get_default_account_id(ynab: YNABClient, budget_id: str) -> Optional[str]:
-    """Get the default account for Amazon transactions."""
+    """Get the default account for Amazon transactions (memoized per budget)."""
+    if budget_id in _default_account_cache:
+        return _default_account_cache[budget_id]
+
     accounts = ynab.get_accounts(budget_id)
 
-    # First: try secret-configured account name
     try:
-        account_name = get_secret("ynab-amazon-account")
-        for acc in accounts:
-            if acc.get("name", "").lower() == account_name.lower():
-                return acc.get("id")
+        account_name = get_secret("ynab-amazon-account").lower()
     except Exception:
-        pass
+        account_name = None
 
-    # Second: look for an account with "amazon" in the name
+    # Candidates in priority order: secret-configured name, "amazon" in the
+    # name, first credit card, first non-closed account
+    candidates = [None, None, None, None]
     for acc in accounts:
-        if "amazon" in acc.get("name", "").lower() and not acc.get("closed"):
-            return acc.get("id")
+        name = acc.get("name", "").lower()
+        if account_name and name == account_name:
+            candidates[0] = acc.get("id")
+            break
+        if acc.get("closed"):
+            continue
+        if candidates[1] is None and "amazon" in name:
+            candidates[1] = acc.get("id")
+        if candidates[2] is None and acc.get("type") == "creditCard":
+            candidates[2] = acc.get("id")
+        if candidates[3] is None:
+            candidates[3] = acc.get("id")
 
-    # Third: first credit card account
-    for acc in accounts:
-        if acc.get("type") == "creditCard" and not acc.get("closed"):
-            return acc.get("id")
+    account_id = next((c for c in candidates if c), None)
+    if account_id:
+        _default_account_cache[budget_id] = account_id
+    return account_id
 
-    # Last resort: first non-closed account
-    for acc in accounts:
-        if not acc.get("closed"):
-            return acc.get("id")
 
+# Days of transactions kept in the per-instance order index
+ORDER_INDEX_DAYS = 90
+
+# Order IDs indexed from memos: retail (111-...) and digital (D01-...) orders
+MEMO_ORDER_ID_PATTERN = re.compile(r'(\d{3}-\d{7}-\d{7}|D01-\d{7}-\d{7})')
+
+# budget_id -> {"since_date", "server_knowledge", "rows": {txn_id: raw},
+#               "by_order": {order_id: txn_id}}
+_order_index_cache = {}
+_order_index_locks = {}
+_order_index_locks_guard = threading.Lock()
+
+
+def find_order_transaction(
+    ynab: YNABClient,
+    budget_id: str,
+    order_id: str,
+    since_date: str,
+) -> Optional[YNABTransaction]:
+    """Find the transaction whose memo contains an Amazon order ID.
+
+    Keeps recent transactions in a per-instance index keyed by the order IDs
+    in their memos, refreshed with YNAB's delta endpoint, so each lookup
+    transfers only what changed instead of every transaction since since_date.
+    Windows older than the index fall back to a full memo scan.
+    """
+    index = _order_index_cache.get(budget_id)
+    index_since = index["since_date"] if index else (
+        datetime.now() - timedelta(days=ORDER_INDEX_DAYS)
+    ).strftime("%Y-%m-%d")
+    if since_date < index_since:
+        return ynab.find_transaction_by_memo(budget_id, order_id, since_date=since_date)
+
+    # Hold the budget's lock through the lookup so a concurrent refresh
+    # can't change the index underneath it
+    with _order_index_lock(budget_id):
+        index = _refresh_order_index(ynab, budget_id)
+        row = index["rows"].get(index["by_order"].get(order_id))
+        if row and row["date"] >= since_date:
+            return YNABClient.parse_transaction(row)
+
+        # Memos can hold IDs the index pattern doesn't extract; match any
+        # substring like find_transaction_by_memo does
+        for row in index["rows"].values():
+            if row["date"] >= since_date and order_id in (row.get("memo") or ""):
+                return YNABClient.parse_transaction(row)
     return None
 
 
+def _order_index_lock(budget_id: str) -> threading.Lock:
+    """Get the lock guarding a budget's order index."""
+    with _order_index_locks_guard:
+        return _order_index_locks.setdefault(budget_id, threading.Lock())
+
+
+def refresh_order_index(ynab: YNABClient, budget_id: str) -> dict:
+    """Create or delta-update the order index for a budget and return it."""
+    # Concurrent callers wait for one refresh instead of each fetching
+    with _order_index_lock(budget_id):
+        return _refresh_order_index(ynab, budget_id)
+
+
+def _refresh_order_index(ynab: YNABClient, budget_id: str) -> dict:
+    """Body of refresh_order_index; the caller holds the budget's lock."""
+    index = _order_index_cache.get(budget_id)
+    if index is None:
+        index_since = (datetime.now() - timedelta(days=ORDER_INDEX_DAYS)).strftime("%Y-%m-%d")
+        index = {"since_date": index_since, "server_knowledge": None, "rows": {}, "by_order": {}}
+        _order_index_cache[budget_id] = index
+
+    rows, server_knowledge = ynab.get_transactions_delta(
+        budget_id,
+        since_date=index["since_date"],
+        last_knowledge_of_server=index["server_knowledge"],
+    )
+    by_order = index["by_order"]
+    orphaned = set()
+    for row in rows:
+        old = index["rows"].pop(row["id"], None)
+        if old:
+            for old_order_id in MEMO_ORDER_ID_PATTERN.findall(old.get("memo") or ""):
+                if by_order.get(old_order_id) == row["id"]:
+                    del by_order[old_order_id]
+                    orphaned.add(old_order_id)
+        if row.get("deleted"):
+            continue
+        index["rows"][row["id"]] = row
+        for memo_order_id in MEMO_ORDER_ID_PATTERN.findall(row.get("memo") or ""):
+            by_order.setdefault(memo_order_id, row["id"])
+
+    # Point order IDs whose row changed at any other row still carrying them
+    orphaned.difference_update(by_order)
+    if orphaned:
+        for txn_id, row in index["rows"].items():
+            for memo_order_id in MEMO_ORDER_ID_PATTERN.findall(row.get("memo") or ""):
+                if memo_order_id in orphaned:
+                    by_order.setdefault(memo_order_id, txn_id)
+
+    # Only advance once the rows are applied, so a failed update is refetched
+    index["server_knowledge"] = server_knowledge
+    return index
+
+
+def warm_ynab_state() -> None:
+    """Load the per-instance YNAB lookups an order needs: budget, categories, order index."""
+    try:
+        ynab = get_ynab_client()
+        budget_id = get_budget_id(ynab, get_budget_name())
+        if budget_id:
+            get_category_index(ynab, budget_id)
+            refresh_order_index(ynab, budget_id)
+    except Exception as e:
+        print(f"Error prefetching YNAB state: {e}")
+
+
 def parsed_order_to_amazon_order(parsed: ParsedOrder) -> AmazonOrder:
     """Convert ParsedOrder to AmazonOrder for categorization."""
     items = [
@@ -174,131 +464,373 @@ def find_matching_transaction(
         unapproved_only=True,
     )
 
+    # since_date already bounds the window from below; compare amounts as
+    # integer milliunits, 1 cent = 10 milliunits
+    target_mu = to_milliunits(order.total)
+
     for trans in transactions:
         date_diff = abs((trans.date - order.order_date).days)
         if date_diff > tolerance_days:
             continue
-        if abs(abs(trans.amount) - order.total) < Decimal("0.01"):
+        if abs(abs(to_milliunits(trans.amount)) - target_mu) < 10:
             return trans
 
     return None
 
 
+def to_milliunits(amount) -> int:
+    """Convert a dollar amount (Decimal, float or int) to YNAB milliunits."""
+    return int(round(amount * 1000))
+
+
 def apply_categorization(
-    ynab: YNABClient,
     budget_id: str,
     transaction,
     result,
     flag_color: str = "orange",
 ) -> bool:
-    """Apply categorization to YNAB transaction."""
-    # Build splits from categorization result
-    splits = []
-    total_assigned = Decimal("0")
-
-    for assignment in result.assignments:
-        amount = -abs(assignment.amount)
-        # For grocery orders (single "Groceries" category), use simple memo
-        if assignment.category_name.lower() == "groceries" and len(result.assignments) == 1:
+    """Apply categorization to YNAB transaction.
+
+    Split math is done in integer milliunits (YNAB's wire format).
+    """
+    # Build subtransactions from categorization result in a single pass
+    assignments = result.assignments
+    subtransactions = [None] * len(assignments)
+    total_assigned = 0
+
+    # For grocery orders (single "Groceries" category), use simple memo
+    single_grocery = len(assignments) == 1 and assignments[0].category_name.lower() == "groceries"
+
+    for i, assignment in enumerate(assignments):
+        amount = -abs(to_milliunits(assignment.amount))
+        if single_grocery:
             memo = "Groceries"
         else:
-            memo = ", ".join([i[:20] for i in assignment.items[:3]])
-        splits.append({
+            memo = ", ".join(item[:20] for item in assignment.items[:3])
+        sub = {
             "amount": amount,
             "category_id": assignment.category_id,
-            "memo": memo,
-        })
+        }
+        if memo:
+            sub["memo"] = memo
+        subtransactions[i] = sub
         total_assigned += amount
 
     # Ensure splits sum exactly to transaction amount (YNAB requirement)
-    transaction_amount = transaction.amount
-    if isinstance(transaction_amount, (int, float)):
-        transaction_amount = Decimal(str(transaction_amount))
+    transaction_amount = to_milliunits(transaction.amount)
 
     diff = transaction_amount - total_assigned
-    if abs(diff) > Decimal("0.001") and splits:
+    if diff and subtransactions:
         # Adjust last split to make totals match
-        splits[-1]["amount"] += diff
-        print(f"Adjusted last split by {diff} to match transaction total")
+        subtransactions[-1]["amount"] += diff
+        print(f"Adjusted last split by {diff / 1000} to match transaction total")
 
-    print(f"Applying {len(splits)} splits totaling {total_assigned} to transaction {transaction.transaction_id}")
+    print(f"Applying {len(subtransactions)} splits totaling {total_assigned / 1000} to transaction {transaction.transaction_id}")
 
     try:
-        writer = YNABWriter(ynab)
-        writer.create_split_transaction(
+        writer = get_ynab_writer()
+        writer.update_transaction(
             budget_id=budget_id,
             transaction_id=transaction.transaction_id,
-            splits=splits,
             memo=f"Amazon Order {result.order_id}",
             flag_color=flag_color,
             approved=True,
+            subtransactions=subtransactions,
         )
         return True
     except Exception as e:
         print(f"Error applying categorization: {e}")
         # Log more details
-        print(f"  Transaction amount: {transaction_amount}")
-        print(f"  Splits total: {total_assigned}")
-        print(f"  Splits: {splits}")
+        print(f"  Transaction amount: {transaction_amount} milliunits")
+        print(f"  Splits total: {total_assigned} milliunits")
+        print(f"  Splits: {subtransactions}")
         return False
 
 
+# Gmail allows at most 100 calls per batch request
+GMAIL_BATCH_SIZE = 100
+
+# Server-side equivalent of the sender/subject triage in fetch_emails_from_history.
+# Replies to our summaries qualify too, since their subjects always carry "Order".
+GMAIL_TRIAGE_QUERY = "(from:amazon.com OR subject:(order OR shipped OR ordered))"
+
+# Headers needed to triage a message before fetching its body
+GMAIL_METADATA_HEADERS = ["Subject", "From", "To", "Date", "Message-ID"]
+
+# Partial-response mask: only the headers and text parts we read. Nested four
+# levels deep to cover forwarded mail (mixed > alternative > related > text).
+# The fields syntax can't recurse, so deeper messages are refetched in full.
+GMAIL_MESSAGE_FIELDS = (
+    "id,threadId,payload(headers(name,value),mimeType,body/data,"
+    "parts(mimeType,body/data,parts(mimeType,body/data,"
+    "parts(mimeType,body/data,parts(mimeType,body/data)))))"
+)
+
+
+def _mask_truncated(msg: dict) -> bool:
+    """Check whether GMAIL_MESSAGE_FIELDS cut off a message's deeper parts.
+
+    A multipart part always has children, so one without "parts" was
+    nested past the depth the mask requests.
+    """
+    stack = [msg.get("payload", {})]
+    while stack:
+        part = stack.pop()
+        children = part.get("parts")
+        if children:
+            stack.extend(children)
+        elif part.get("mimeType", "").startswith("multipart/"):
+            return True
+    return False
+
+
+def get_email_body(email_data: dict, key: str) -> str:
+    """Get an email's "html_body" or "text_body", decoding it on first use.
+
+    _parse_message keeps Gmail bodies base64-encoded under "_raw_bodies", so
+    correction replies (which only read text_body) never decode the much
+    larger HTML alternative. Dicts that already carry decoded bodies, like
+    the HTTP endpoint's, are returned as-is.
+    """
+    if key in email_data:
+        return email_data[key]
+    data = email_data.get("_raw_bodies", {}).get(key)
+    value = base64.urlsafe_b64decode(data).decode("utf-8", errors="replace") if data else ""
+    # Decoding is deterministic, so concurrent readers storing it is harmless
+    return email_data.setdefault(key, value)
+
+
+def _parse_message(msg: dict) -> dict:
+    """Convert a Gmail API message resource into our email dict."""
+    payload = msg.get("payload", {})
+    headers = payload.get("headers", [])
+
+    # One pass over the headers; reversed so the first occurrence wins
+    header_values = {h["name"].lower(): h["value"] for h in reversed(headers)}
+
+    def get_body(payload):
+        html_body = ""
+        text_body = ""
+        stack = [payload]
+        # Depth-first in document order; the first html/plain part found is kept
+        while stack and not (html_body and text_body):
+            part = stack.pop()
+            mime = part.get("mimeType", "")
+            # Attachments never hold the text we want
+            if mime.startswith(("image/", "application/")):
+                continue
+            data = part.get("body", {}).get("data", "")
+            if data:
+                if mime == "text/html" and not html_body:
+                    html_body = data
+                elif mime == "text/plain" and not text_body:
+                    text_body = data
+            stack.extend(reversed(part.get("parts", [])))
+        return html_body, text_body
+
+    # Still base64 - get_email_body decodes each body only if it is read
+    html_body, text_body = get_body(payload)
+
+    return {
+        "id": msg.get("id"),
+        "thread_id": msg.get("threadId"),  # For reply threading
+        "message_id": header_values.get("message-id", ""),
+        "subject": header_values.get("subject", ""),
+        "from": header_values.get("from", ""),
+        "to": header_values.get("to", ""),
+        "date": header_values.get("date", ""),  # Email date with timezone
+        "_raw_bodies": {"html_body": html_body, "text_body": text_body},
+    }
+
+
 def fetch_email_by_id(gmail_service, msg_id: str) -> Optional[dict]:
     """Fetch a single email by ID."""
     try:
-        msg = gmail_service.users().messages().get(
+        messages = gmail_service.users().messages()
+        msg = messages.get(
             userId="me",
             id=msg_id,
-            format="full"
+            format="full",
+            fields=GMAIL_MESSAGE_FIELDS,
         ).execute()
-
-        payload = msg.get("payload", {})
-        headers = payload.get("headers", [])
-
-        def get_header(name):
-            for h in headers:
-                if h["name"].lower() == name.lower():
-                    return h["value"]
-            return ""
-
-        def get_body(payload):
-            html_body = ""
-            text_body = ""
-
-            def extract(part):
-                nonlocal html_body, text_body
-                mime = part.get("mimeType", "")
-                data = part.get("body", {}).get("data", "")
-                if data:
-                    decoded = base64.urlsafe_b64decode(data).decode("utf-8", errors="replace")
-                    if mime == "text/html":
-                        html_body = decoded
-                    elif mime == "text/plain":
-                        text_body = decoded
-                for p in part.get("parts", []):
-                    extract(p)
-
-            extract(payload)
-            return html_body, text_body
-
-        html_body, text_body = get_body(payload)
-
-        return {
-            "id": msg_id,
-            "thread_id": msg.get("threadId"),  # For reply threading
-            "message_id": get_header("Message-ID"),
-            "subject": get_header("Subject"),
-            "from": get_header("From"),
-            "to": get_header("To"),
-            "date": get_header("Date"),  # Email date with timezone
-            "html_body": html_body,
-            "text_body": text_body,
-        }
+        if _mask_truncated(msg):
+            msg = messages.get(userId="me", id=msg_id, format="full").execute()
+        return _parse_message(msg)
     except Exception as e:
         print(f"Error fetching email {msg_id}: {e}")
         return None
 
 
+def fetch_emails_by_ids(gmail_service, msg_ids: list, metadata_only: bool = False) -> list:
+    """Fetch several emails using Gmail batch requests.
+
+    Collapses one round trip per message into one per GMAIL_BATCH_SIZE
+    messages. Messages that fail to fetch are skipped. With metadata_only,
+    only the headers are fetched and the bodies come back empty.
+
+    Returns:
+        Email dicts in the same order as msg_ids
+    """
+    results = {}
+    truncated = []
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            print(f"Error fetching email {request_id}: {exception}")
+            return
+        if not metadata_only and _mask_truncated(response):
+            truncated.append(request_id)
+            return
+        try:
+            results[request_id] = _parse_message(response)
+        except Exception as e:
+            print(f"Error parsing email {request_id}: {e}")
+
+    messages = gmail_service.users().messages()
+
+    def request_for(msg_id):
+        if metadata_only:
+            return messages.get(
+                userId="me", id=msg_id, format="metadata",
+                metadataHeaders=GMAIL_METADATA_HEADERS, fields="id,threadId,payload/headers",
+            )
+        return messages.get(userId="me", id=msg_id, format="full", fields=GMAIL_MESSAGE_FIELDS)
+
+    for i in range(0, len(msg_ids), GMAIL_BATCH_SIZE):
+        batch = gmail_service.new_batch_http_request(callback=on_response)
+        for msg_id in msg_ids[i:i + GMAIL_BATCH_SIZE]:
+            batch.add(
+                request_for(msg_id),
+                request_id=msg_id,
+            )
+        try:
+            batch.execute()
+        except Exception as e:
+            print(f"Error executing Gmail batch: {e}")
+
+    # Bodies nested past the field mask need the unmasked message
+    for msg_id in truncated:
+        try:
+            msg = messages.get(userId="me", id=msg_id, format="full").execute()
+            results[msg_id] = _parse_message(msg)
+        except Exception as e:
+            print(f"Error fetching email {msg_id}: {e}")
+
+    return [results[msg_id] for msg_id in msg_ids if msg_id in results]
+
+
+def fetch_thread_snippets(gmail_service, thread_ids: list) -> dict:
+    """Fetch message snippets for several threads using Gmail batch requests.
+
+    Returns:
+        Dict of thread ID -> list of message snippets; failed threads are omitted
+    """
+    results = {}
+
+    def on_response(request_id, response, exception):
+        if exception is not None:
+            print(f"Error fetching thread {request_id}: {exception}")
+            return
+        results[request_id] = [m.get("snippet", "") for m in response.get("messages", [])]
+
+    for i in range(0, len(thread_ids), GMAIL_BATCH_SIZE):
+        batch = gmail_service.new_batch_http_request(callback=on_response)
+        for thread_id in thread_ids[i:i + GMAIL_BATCH_SIZE]:
+            batch.add(
+                gmail_service.users().threads().get(
+                    userId="me", id=thread_id, format="minimal", fields="messages/snippet"
+                ),
+                request_id=thread_id,
+            )
+        try:
+            batch.execute()
+        except Exception as e:
+            print(f"Error executing Gmail batch: {e}")
+
+    return results
+
+
+# Email-scanning patterns, compiled once per instance
+ORDER_ID_PATTERN = re.compile(r'(\d{3}-\d{7}-\d{7})')
+# Rest of the line up to a newline or <br>; written without a lazy quantifier
+# so each character is consumed once instead of retesting the terminators
+FORWARDED_DATE_PATTERN = re.compile(r'Date:\s*((?:[^\n<]|<(?!br))+)', re.IGNORECASE)
+ANGLE_ADDRESS_PATTERN = re.compile(r'<([^>]+)>')
+# Whole words, matching Gmail's word-based subject: search in GMAIL_TRIAGE_QUERY
+AMAZON_SUBJECT_PATTERN = re.compile(r'\b(?:order|shipped|ordered)\b', re.IGNORECASE)
+AMAZON_BODY_PATTERN = re.compile(r'amazon', re.IGNORECASE)
+
+# Reply-parsing patterns, compiled once per instance
+HTML_TAG_PATTERN = re.compile(r'<[^>]+>')
+REPLY_MARKER_PATTERN = re.compile(
+    r'^(?:On .+ wrote:|(?i:-+ ?Original Message ?-+)|(?i:-+ ?Forwarded message ?-+))$'
+)
+MULTI_BLANK_PATTERN = re.compile(r'\n{3,}')
+
+
+class _ReplyHTMLExtractor(HTMLParser):
+    """Collect visible text from an HTML reply, dropping quoted subtrees.
+
+    Tag boundaries become newlines, matching the old regex tag stripping.
+    """
+
+    SKIP_TAGS = {"blockquote", "script", "style"}
+    SKIP_CLASSES = {"gmail_quote", "gmail_extra"}
+    VOID_TAGS = {
+        "area", "base", "br", "col", "embed", "hr", "img", "input",
+        "link", "meta", "source", "track", "wbr",
+    }
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        # While skipping, only tags named like the one that opened the skip
+        # are counted, so unclosed <p>/<li> or stray end tags inside the
+        # quote can't unbalance it
+        self._skip_tag = None
+        self._skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.VOID_TAGS:
+            if not self._skip_depth:
+                self.parts.append("\n")
+            return
+        if self._skip_depth:
+            if tag == self._skip_tag:
+                self._skip_depth += 1
+            return
+        classes = (dict(attrs).get("class") or "").split()
+        if tag in self.SKIP_TAGS or self.SKIP_CLASSES.intersection(classes):
+            self._skip_tag = tag
+            self._skip_depth = 1
+            return
+        self.parts.append("\n")
+
+    def handle_endtag(self, tag):
+        if tag in self.VOID_TAGS:
+            return
+        if self._skip_depth:
+            if tag == self._skip_tag:
+                self._skip_depth -= 1
+            return
+        self.parts.append("\n")
+
+    def handle_data(self, data):
+        if not self._skip_depth:
+            self.parts.append(data)
+
+    def text(self) -> str:
+        return "".join(self.parts).replace("\xa0", " ")
+
+
+def _html_to_reply_text(html_body: str) -> str:
+    """Convert an HTML-only reply to text without its quoted sections."""
+    extractor = _ReplyHTMLExtractor()
+    extractor.feed(html_body)
+    extractor.close()
+    return extractor.text()
+
+
 def extract_reply_text(email_data: dict) -> str:
     """Extract just the user's reply text, stripping quoted content.
 
@@ -309,16 +841,19 @@ def extract_reply_text(email_data: dict) -> str:
         The user's reply text with quoted content removed
     """
     # Prefer text body for easier parsing
-    body = email_data.get("text_body", "") or email_data.get("html_body", "")
-
-    if not body:
+    body = get_email_body(email_data, "text_body")
+
+    if body:
+        # Strip any stray HTML tags
+        body = HTML_TAG_PATTERN.sub('\n', body)
+        body = body.replace('&nbsp;', ' ')
+        body = body.replace('&lt;', '<').replace('&gt;', '>')
+    elif get_email_body(email_data, "html_body"):
+        # HTML-only: parse it and drop quoted subtrees outright
+        body = _html_to_reply_text(get_email_body(email_data, "html_body"))
+    else:
         return ""
 
-    # Strip HTML tags if present
-    body = re.sub(r'<[^>]+>', '\n', body)
-    body = body.replace('&nbsp;', ' ')
-    body = body.replace('&lt;', '<').replace('&gt;', '>')
-
     lines = body.split('\n')
     reply_lines = []
 
@@ -326,13 +861,9 @@ def extract_reply_text(email_data: dict) -> str:
         stripped = line.strip()
 
         # Stop at common reply markers
-        if re.match(r'^On .+ wrote:$', stripped):
-            break
-        if re.match(r'^-+ ?Original Message ?-+$', stripped, re.IGNORECASE):
-            break
-        if re.match(r'^-+ ?Forwarded message ?-+$', stripped, re.IGNORECASE):
+        if REPLY_MARKER_PATTERN.match(stripped):
             break
-        if re.match(r'^From:', stripped) and len(reply_lines) > 0:
+        if stripped.startswith('From:') and len(reply_lines) > 0:
             # "From:" at start of email is OK, but after content it's quoted
             break
 
@@ -346,11 +877,58 @@ def extract_reply_text(email_data: dict) -> str:
     result = '\n'.join(reply_lines).strip()
 
     # Remove multiple blank lines
-    result = re.sub(r'\n{3,}', '\n\n', result)
+    result = MULTI_BLANK_PATTERN.sub('\n\n', result)
 
     return result
 
 
+# Body of a ```json fenced block; the closing fence is optional in case of truncation
+CODE_FENCE_PATTERN = re.compile(r'```(?:json)?\s*(.*?)\s*(?:```|$)', re.DOTALL)
+
+CORRECTION_COMMAND_PATTERN = re.compile(
+    r'(?:categorize|make|set|move)\s+(.+?)\s+(?:as|to|in|into)\s+(.+?)[.!]?',
+    re.IGNORECASE,
+)
+
+
+def parse_correction_fast(
+    reply_text: str,
+    cat_lookup: dict,
+    cat_id_to_name: dict,
+    current_splits: list,
+) -> Optional[dict]:
+    """Parse a simple one-line "categorize X as Y" reply without calling Claude.
+
+    Only handles the unambiguous case: a single line naming an exact
+    category and an item that matches exactly one split memo. Anything
+    else returns None so the caller falls back to parse_correction_request.
+    Bare numeric replies are left to Claude, since the options they refer
+    to are only in the earlier clarification email.
+    """
+    text = reply_text.strip()
+    if "\n" in text:
+        return None
+
+    match = CORRECTION_COMMAND_PATTERN.fullmatch(text)
+    if not match:
+        return None
+
+    item = match.group(1).strip(" \"'")
+    cat_id = cat_lookup.get(match.group(2).strip(" \"'").lower())
+    if not item or not cat_id:
+        return None
+
+    item_lower = item.lower()
+    matches = [s for s in current_splits if item_lower in s.get("memo", "").lower()]
+    if len(matches) != 1:
+        return None
+
+    return {
+        "action": "update",
+        "changes": [{"item": item, "new_category": cat_id_to_name[cat_id]}],
+    }
+
+
 def parse_correction_request(
     reply_text: str,
     categories: list,
@@ -371,8 +949,6 @@ def parse_correction_request(
         - {"action": "clarify", "options": [...], "pending_category": "..."}
         - {"action": "none", "reason": "..."}
     """
-    from config import CLAUDE_MODEL
-
     # Build category list string
     category_names = [c.name for c in categories]
     categories_str = ", ".join(category_names)
@@ -391,16 +967,12 @@ def parse_correction_request(
         splits_desc.append(f"- {memo}: {cat_name} (${amount_dollars:.2f})")
     splits_str = "\n".join(splits_desc) if splits_desc else "No items found"
 
-    prompt = f"""Parse this categorization correction request.
+    # Categories and rules are identical across replies, so they go in a
+    # cached block ahead of the per-reply details
+    static_prompt = f"""Parse this categorization correction request.
 
 Available categories: {categories_str}
 
-Current categorization:
-{splits_str}
-
-User's message:
-{reply_text}
-
 Rules:
 1. Match user's category to closest available category (best guess, no confirmation needed)
 2. Only ask for clarification if you cannot identify which ITEM the user means
@@ -414,20 +986,34 @@ Return JSON only:
 
 Return ONLY valid JSON, no other text."""
 
+    request_prompt = f"""Current categorization:
+{splits_str}
+
+User's message:
+{reply_text}"""
+
     response = client.messages.create(
         model=CLAUDE_MODEL,
-        max_tokens=512,
-        messages=[{"role": "user", "content": prompt}]
+        max_tokens=256,
+        messages=[{
+            "role": "user",
+            "content": [
+                {
+                    "type": "text",
+                    "text": static_prompt,
+                    "cache_control": {"type": "ephemeral"},
+                },
+                {"type": "text", "text": request_prompt},
+            ],
+        }]
     )
 
     response_text = response.content[0].text.strip()
 
     # Extract JSON from markdown code blocks if present
-    if "```" in response_text:
-        response_text = response_text.split("```")[1].split("```")[0]
-        if response_text.startswith("json"):
-            response_text = response_text[4:]
-        response_text = response_text.strip()
+    fence = CODE_FENCE_PATTERN.search(response_text)
+    if fence:
+        response_text = fence.group(1)
 
     try:
         return json.loads(response_text)
@@ -436,11 +1022,11 @@ Return ONLY valid JSON, no other text."""
 
 
 def apply_category_corrections(
-    ynab: YNABClient,
     budget_id: str,
     transaction,
     changes: list,
     categories: list,
+    cat_lookup: Optional[dict] = None,
 ) -> bool:
     """Apply category corrections by deleting and recreating the transaction.
 
@@ -448,34 +1034,41 @@ def apply_category_corrections(
     Workaround: Delete the transaction and recreate it with corrected categories.
 
     Args:
-        ynab: YNAB client
         budget_id: Budget ID
         transaction: YNABTransaction with subtransactions
         changes: List of {"item": "...", "new_category": "..."}
         categories: List of YNABCategory objects for ID lookup
+        cat_lookup: Optional prebuilt lowercased name -> ID map
 
     Returns:
         True if successfully updated
     """
     # Build category name -> ID lookup (case-insensitive)
-    cat_lookup = {c.name.lower(): c.category_id for c in categories}
+    if cat_lookup is None:
+        cat_lookup = {c.name.lower(): c.category_id for c in categories}
 
     subtransactions = transaction.subtransactions.copy()
     if not subtransactions:
         print(f"Transaction {transaction.transaction_id} has no subtransactions")
         return False
 
+    # Lowercased names for the fuzzy fallback and memos for item matching,
+    # built once for all changes
+    lowered_categories = [(c.name.lower(), c) for c in categories]
+    lowered_memos = [sub.get("memo", "").lower() for sub in subtransactions]
+
     changed = False
     for change in changes:
         item_match = change["item"].lower()
         new_category = change["new_category"]
+        new_category_lower = new_category.lower()
 
         # Find category ID (case-insensitive, with fuzzy matching)
-        new_cat_id = cat_lookup.get(new_category.lower())
+        new_cat_id = cat_lookup.get(new_category_lower)
         if not new_cat_id:
             # Try fuzzy match
-            for cat in categories:
-                if new_category.lower() in cat.name.lower() or cat.name.lower() in new_category.lower():
+            for name_lower, cat in lowered_categories:
+                if new_category_lower in name_lower or name_lower in new_category_lower:
                     new_cat_id = cat.category_id
                     new_category = cat.name  # Use canonical name
                     break
@@ -485,10 +1078,10 @@ def apply_category_corrections(
             continue
 
         # Find and update matching subtransaction
-        for i, sub in enumerate(subtransactions):
-            memo = sub.get("memo", "").lower()
+        for i, memo in enumerate(lowered_memos):
             if item_match in memo:
-                subtransactions[i]["category_id"] = new_cat_id
+                sub = subtransactions[i]
+                sub["category_id"] = new_cat_id
                 changed = True
                 print(f"Updated '{sub.get('memo', '')}' to category '{new_category}'")
                 break
@@ -502,8 +1095,8 @@ def apply_category_corrections(
     for sub in subtransactions:
         amount = sub.get("amount", 0)
         # If already in milliunits (int), keep it; otherwise convert
-        if isinstance(amount, (float, Decimal)):
-            amount = int(amount * 1000)
+        if not isinstance(amount, int):
+            amount = to_milliunits(amount)
         formatted_subs.append({
             "amount": amount,
             "category_id": sub.get("category_id"),
@@ -511,7 +1104,7 @@ def apply_category_corrections(
         })
         print(f"  Subtransaction: {sub.get('memo')} -> cat_id={sub.get('category_id')}")
 
-    writer = YNABWriter(ynab)
+    writer = get_ynab_writer()
 
     # YNAB API limitation: Can't update category_id on split transactions
     # Workaround: Delete and recreate the transaction
@@ -546,6 +1139,77 @@ def apply_category_corrections(
         return False
 
 
+# Learned item pattern -> category rules, loaded from Firestore once per instance
+MIN_RULE_PATTERN_LENGTH = 4
+_category_rules = None
+
+
+def _rule_regex(pattern: str) -> re.Pattern:
+    """Whole-word matcher for a rule pattern, so "black" doesn't match "blackout"."""
+    return re.compile(rf'(?<!\w){re.escape(pattern)}(?!\w)')
+
+
+def get_category_rules() -> list:
+    """Get (pattern, category_name, regex) rules learned from past corrections."""
+    global _category_rules
+    if _category_rules is None:
+        try:
+            db = get_firestore_client()
+            rules = []
+            for doc in db.collection("category_rules").stream():
+                data = doc.to_dict()
+                if data.get("pattern") and data.get("category"):
+                    rules.append((data["pattern"], data["category"], _rule_regex(data["pattern"])))
+            _category_rules = rules
+            print(f"Loaded {len(rules)} category rules")
+        except Exception as e:
+            print(f"Error loading category rules: {e}")
+            return []
+    return _category_rules
+
+
+def apply_category_rules(order: AmazonOrder) -> dict:
+    """Pre-assign categories to uncached items matching a learned rule.
+
+    The result is passed to categorize_order as preassigned, so an order
+    whose items all match skips Claude entirely. Rule matches are guesses,
+    so they are never written to the item category cache.
+
+    Returns:
+        Dict of item title -> category name for items a rule matched
+    """
+    rules = get_category_rules()
+    if not rules:
+        return {}
+
+    assigned = {}
+    for item in order.items:
+        if get_cached_category(item.title):
+            continue
+        title = item.title.lower()
+        for _, category, regex in rules:
+            if regex.search(title):
+                assigned[item.title] = category
+                break
+    return assigned
+
+
+def save_category_rules_from_corrections(changes: list) -> None:
+    """Persist corrections as rules so later orders skip the LLM for those items."""
+    from api_writer import save_category_rule
+
+    rules = get_category_rules()
+    for change in changes:
+        pattern = change["item"].strip().lower()
+        if len(pattern) < MIN_RULE_PATTERN_LENGTH:
+            continue
+        save_category_rule(pattern, change["new_category"], os.getenv("GCP_PROJECT_ID"))
+        if _category_rules is not None:
+            # Newest rule wins over older ones for the same items
+            rules[:] = [r for r in rules if r[0] != pattern]
+            rules.insert(0, (pattern, change["new_category"], _rule_regex(pattern)))
+
+
 def update_category_cache_from_corrections(changes: list, subtransactions: list) -> None:
     """Update the category cache based on corrections.
 
@@ -590,12 +1254,8 @@ def process_correction_reply(
         Dict with status and message
     """
     # Skip if this is FROM our receipts email (it's our own automated reply)
-    from_addr = email_data.get("from", "").lower()
-    try:
-        from config_private import RECEIPTS_EMAIL
-        receipts_email = RECEIPTS_EMAIL.lower()
-    except ImportError:
-        receipts_email = ""  # No receipts email configured
+    from_addr = email_data.get("_from_lower") or email_data.get("from", "").lower()
+    receipts_email = RECEIPTS_EMAIL_LOWER
 
     if receipts_email in from_addr:
         return {"status": "skipped", "message": "Skipping our own automated reply"}
@@ -615,15 +1275,16 @@ def process_correction_reply(
     # Get YNAB client and find the transaction
     ynab = get_ynab_client()
     budget_name = get_budget_name()
-    budget_id = ynab.get_budget_id(budget_name)
+    budget_id = get_budget_id(ynab, budget_name)
 
     if not budget_id:
         return {"status": "error", "message": f"Budget '{budget_name}' not found"}
 
     # Find the transaction by order ID (search last 90 days)
-    from datetime import timedelta
     since_date = (datetime.now() - timedelta(days=90)).strftime("%Y-%m-%d")
-    transaction = ynab.find_transaction_by_order_id(budget_id, order_id, since_date=since_date)
+    found = find_order_transaction(ynab, budget_id, order_id, since_date)
+    # Fetch full details to ensure we have subtransactions
+    transaction = ynab.get_transaction_by_id(budget_id, found.transaction_id) if found else None
 
     if not transaction:
         # Send error reply
@@ -640,12 +1301,9 @@ def process_correction_reply(
         return {"status": "error", "message": f"Transaction not found for order {order_id}"}
 
     # Get categories for parsing
-    all_categories = ynab.get_categories(budget_id)
-    excluded_groups = ['library renovation']
-    categories = [c for c in all_categories if c.group_name.lower() not in excluded_groups]
+    categories, cat_lookup, cat_id_to_name = get_category_index(ynab, budget_id)
 
     # Build current splits info with category names
-    cat_id_to_name = {c.category_id: c.name for c in categories}
     current_splits = []
     for sub in transaction.subtransactions:
         cat_id = sub.get("category_id")
@@ -655,9 +1313,11 @@ def process_correction_reply(
             "amount": sub.get("amount", 0),
         })
 
-    # Parse the correction request with Claude
-    claude = get_anthropic_client()
-    parsed = parse_correction_request(reply_text, categories, current_splits, claude)
+    # Parse the correction request, only calling Claude when the simple parser can't
+    parsed = parse_correction_fast(reply_text, cat_lookup, cat_id_to_name, current_splits)
+    if parsed is None:
+        claude = get_anthropic_client()
+        parsed = parse_correction_request(reply_text, categories, current_splits, claude)
 
     print(f"Parsed correction: {parsed}")
 
@@ -666,17 +1326,13 @@ def process_correction_reply(
     sender_email = None
     if from_addr and "@" in from_addr:
         if "<" in from_addr and ">" in from_addr:
-            match = re.search(r'<([^>]+)>', from_addr)
+            match = ANGLE_ADDRESS_PATTERN.search(from_addr)
             sender_email = match.group(1) if match else from_addr
         else:
             sender_email = from_addr
 
     # Get receipts email for CC
-    try:
-        from config_private import RECEIPTS_EMAIL
-        receipts_email = RECEIPTS_EMAIL
-    except ImportError:
-        receipts_email = None
+    receipts_email = RECEIPTS_EMAIL
 
     # Build recipients: sender in TO, receipts inbox in CC
     recipients = [sender_email] if sender_email else []
@@ -706,11 +1362,11 @@ def process_correction_reply(
 
         # Apply the corrections
         success = apply_category_corrections(
-            ynab=ynab,
             budget_id=budget_id,
             transaction=transaction,
             changes=changes,
             categories=categories,
+            cat_lookup=cat_lookup,
         )
 
         if not success:
@@ -726,8 +1382,9 @@ def process_correction_reply(
             )
             return {"status": "error", "message": "Failed to apply corrections"}
 
-        # Update the category cache for future orders
+        # Update the category cache and learned rules for future orders
         update_category_cache_from_corrections(changes, transaction.subtransactions)
+        save_category_rules_from_corrections(changes)
 
         # Fetch the updated transaction
         updated_transaction = ynab.get_transaction_by_id(budget_id, transaction.transaction_id)
@@ -736,10 +1393,7 @@ def process_correction_reply(
 
         # YNAB API may have eventual consistency - manually apply our changes to category names
         # Build a map of item -> new category from our changes
-        item_to_new_cat = {}
-        for change in changes:
-            item_match = change["item"].lower()
-            item_to_new_cat[item_match] = change["new_category"]
+        item_to_new_cat = {change["item"].lower(): change["new_category"] for change in changes}
 
         # Update category names in subtransactions based on our changes
         for sub in updated_transaction.subtransactions:
@@ -785,14 +1439,33 @@ def process_correction_reply(
         return {"status": "no_action", "message": reason}
 
 
+# Per-instance mirrors of Firestore state. Processed emails are never
+# unmarked, so known IDs never go stale; unknown IDs are still checked
+# remotely since another instance may have claimed them.
+_stored_history_id = None
+_processed_email_ids = set()
+
+# Gmail thread ID -> Amazon order ID. Only hits are cached: a thread's order
+# ID never changes, but a thread without one is rechecked next time.
+_thread_order_cache = {}
+
+
 def get_stored_history_id() -> Optional[str]:
-    """Get the last processed history ID from Firestore."""
+    """Get the last processed history ID (Firestore, cached after first read).
+
+    A value saved by another instance is picked up on this instance's next
+    cold start; until then history is read from an older ID, which only
+    re-lists messages the processed-email checks already skip.
+    """
+    global _stored_history_id
+    if _stored_history_id is not None:
+        return _stored_history_id
     try:
-        from google.cloud import firestore
-        db = firestore.Client(project=os.getenv("GCP_PROJECT_ID"))
+        db = get_firestore_client()
         doc = db.collection("config").document("gmail_history").get()
         if doc.exists:
-            return doc.to_dict().get("history_id")
+            _stored_history_id = doc.to_dict().get("history_id")
+            return _stored_history_id
     except Exception as e:
         print(f"Error getting stored history ID: {e}")
     return None
@@ -800,33 +1473,71 @@ def get_stored_history_id() -> Optional[str]:
 
 def save_history_id(history_id: str) -> None:
     """Save the last processed history ID to Firestore."""
+    global _stored_history_id
     from api_writer import save_history_id as _save_history_id
     _save_history_id(history_id, os.getenv("GCP_PROJECT_ID"))
+    _stored_history_id = history_id
+
+
+def claim_history_id(history_id: str) -> bool:
+    """Claim a push notification's history ID. Returns False if another instance has it."""
+    from api_writer import claim_history_id as _claim_history_id
+    return _claim_history_id(history_id, project_id=os.getenv("GCP_PROJECT_ID"))
+
+
+def release_history_id(history_id: str) -> None:
+    """Release a history ID claim so Pub/Sub's retry can process it."""
+    from api_writer import release_history_id as _release_history_id
+    _release_history_id(history_id, project_id=os.getenv("GCP_PROJECT_ID"))
 
 
 def is_email_processed(email_id: str) -> bool:
     """Check if an email has already been processed (prevents race conditions)."""
+    if email_id in _processed_email_ids:
+        return True
     try:
-        from google.cloud import firestore
-        db = firestore.Client(project=os.getenv("GCP_PROJECT_ID"))
+        db = get_firestore_client()
         doc = db.collection("processed_emails").document(email_id).get()
+        if doc.exists:
+            _processed_email_ids.add(email_id)
         return doc.exists
     except Exception as e:
         print(f"Error checking processed email: {e}")
         return False
 
 
+def get_processed_email_ids(email_ids: list) -> set:
+    """Return which of the given emails have already been processed.
+
+    One batched Firestore read instead of an is_email_processed call per email.
+    """
+    known = {email_id for email_id in email_ids if email_id in _processed_email_ids}
+    unknown = [email_id for email_id in email_ids if email_id not in known]
+    if not unknown:
+        return known
+    try:
+        db = get_firestore_client()
+        collection = db.collection("processed_emails")
+        docs = db.get_all([collection.document(email_id) for email_id in unknown])
+        _processed_email_ids.update(doc.id for doc in docs if doc.exists)
+    except Exception as e:
+        print(f"Error checking processed emails: {e}")
+    return {email_id for email_id in email_ids if email_id in _processed_email_ids}
+
+
 def mark_email_processed(email_id: str, order_id: str) -> bool:
     """Mark an email as processed. Returns False if already processed (race condition)."""
     from api_writer import mark_email_processed as _mark_email_processed
-    return _mark_email_processed(email_id, order_id, os.getenv("GCP_PROJECT_ID"))
+    claimed = _mark_email_processed(email_id, order_id, os.getenv("GCP_PROJECT_ID"))
+    if claimed:
+        _processed_email_ids.add(email_id)
+    return claimed
 
 
 def get_watch_expiration() -> Optional[int]:
     """Get the Gmail watch expiration timestamp from Firestore."""
     try:
-        from google.cloud import firestore
-        db = firestore.Client(project=os.getenv("GCP_PROJECT_ID"))
+        db = get_firestore_client()
         doc = db.collection("config").document("gmail_watch").get()
         if doc.exists:
             return doc.to_dict().get("expiration")
@@ -846,7 +1557,7 @@ def renew_gmail_watch_if_needed(gmail_service) -> None:
     from api_writer import setup_gmail_watch
     try:
         expiration = get_watch_expiration()
-        now_ms = int(datetime.now().timestamp() * 1000)
+        now_ms = int(time.time() * 1000)
         one_day_ms = 24 * 60 * 60 * 1000
 
         # Renew if no expiration stored or within 1 day of expiring
@@ -865,13 +1576,25 @@ def renew_gmail_watch_if_needed(gmail_service) -> None:
         print(f"Error checking/renewing Gmail watch: {e}")
 
 
-def fetch_emails_from_history(gmail_service, notification_history_id: str) -> list:
+def is_reply_subject(subject: str) -> bool:
+    """True for "Re:" subjects, checking only the prefix rather than lowercasing it all."""
+    return subject[:3].lower() == "re:"
+
+
+def fetch_emails_from_history(
+    gmail_service,
+    notification_history_id: str,
+    email_address: Optional[str] = None,
+) -> list:
     """
     Fetch emails using History API.
 
     The notification's historyId is the LATEST ID - nothing after it.
     We need to query from our STORED history ID to get changes.
     Then update stored ID to the notification's ID.
+
+    email_address is the inbox from the notification, used to spot our own
+    emails when RECEIPTS_EMAIL isn't configured.
     """
     stored_history_id = get_stored_history_id()
 
@@ -883,27 +1606,28 @@ def fetch_emails_from_history(gmail_service, notification_history_id: str) -> li
 
     print(f"Fetching history from {stored_history_id} to {notification_history_id}")
 
-    new_message_ids = set()
+    # Dict as an insertion-ordered set, so batches and logs follow history order
+    new_message_ids = {}
 
     # If history IDs match, we can't get changes from history API - fetch recent messages instead
     if stored_history_id == notification_history_id:
         print("History IDs match - checking recent INBOX messages")
         try:
             # Get messages from the last hour
-            import time
             one_hour_ago = int(time.time()) - 3600
             recent_msgs = gmail_service.users().messages().list(
                 userId="me",
                 labelIds=["INBOX"],
-                q=f"after:{one_hour_ago}",
+                q=f"after:{one_hour_ago} {GMAIL_TRIAGE_QUERY}",
                 maxResults=10,
             ).execute()
 
-            for msg in recent_msgs.get("messages", []):
-                msg_id = msg.get("id")
-                # Check if we've already processed this message
-                if msg_id and not is_email_processed(msg_id):
-                    new_message_ids.add(msg_id)
+            recent_ids = [msg["id"] for msg in recent_msgs.get("messages", []) if msg.get("id")]
+            # Check which of these we've already processed, in one lookup
+            processed = get_processed_email_ids(recent_ids)
+            for msg_id in recent_ids:
+                if msg_id not in processed:
+                    new_message_ids[msg_id] = None
                     print(f"Found unprocessed recent message: {msg_id}")
         except Exception as e:
             print(f"Error fetching recent messages: {e}")
@@ -922,7 +1646,7 @@ def fetch_emails_from_history(gmail_service, notification_history_id: str) -> li
                 for msg in record.get("messagesAdded", []):
                     msg_id = msg.get("message", {}).get("id")
                     if msg_id:
-                        new_message_ids.add(msg_id)
+                        new_message_ids[msg_id] = None
         except Exception as e:
             print(f"Error fetching history: {e}")
 
@@ -931,69 +1655,88 @@ def fetch_emails_from_history(gmail_service, notification_history_id: str) -> li
         save_history_id(notification_history_id)  # Update pointer
         return []
 
-    print(f"Found {len(new_message_ids)} new message(s): {list(new_message_ids)}")
+    print(f"Found {len(new_message_ids)} new message(s): {', '.join(new_message_ids)}")
 
-    # Fetch each message and filter for Amazon emails
-    emails = []
-    for msg_id in new_message_ids:
-        email = fetch_email_by_id(gmail_service, msg_id)
-        if not email:
-            continue
+    # Stage 1: headers only - enough to triage replies, self-sent and
+    # non-Amazon mail without downloading any bodies
+    headers_only = fetch_emails_by_ids(gmail_service, list(new_message_ids), metadata_only=True)
+
+    # Threads of replies are searched for an order ID; fetch the ones not
+    # already resolved on this instance in one batch too
+    reply_thread_ids = {
+        email.get("thread_id") for email in headers_only
+        if email.get("thread_id") and is_reply_subject(email.get("subject", ""))
+    }
+    thread_snippets = fetch_thread_snippets(
+        gmail_service, [t for t in reply_thread_ids if t not in _thread_order_cache]
+    )
+    for thread_id, snippets in thread_snippets.items():
+        # The order confirmation or our summary opens the thread, so scan oldest first
+        for snippet in snippets:
+            order_match = ORDER_ID_PATTERN.search(snippet)
+            if order_match:
+                _thread_order_cache[thread_id] = order_match.group(1)
+                break
 
+    # Receipts email from config (falls back to the notification's address)
+    receipts_email = RECEIPTS_EMAIL_LOWER or (email_address.lower() if email_address else "")
+
+    # Candidates needing a full fetch: msg_id -> order ID for correction
+    # replies, None for receipts
+    candidates = {}
+    needs_body_check = set()
+    from_lower = {}  # msg_id -> lowercased From, reused by the correction path
+    for email in headers_only:
+        msg_id = email["id"]
         subject = email.get("subject", "")
-        subject_lower = subject.lower()
-        from_addr = email.get("from", "").lower()
+        from_addr = from_lower[msg_id] = email.get("from", "").lower()
 
         # Check if this is a reply - could be a correction request
-        if subject_lower.startswith("re:"):
+        if is_reply_subject(subject):
             # Look for order ID in the thread
-            thread_id = email.get("thread_id")
-            order_id = None
-
-            if thread_id:
-                try:
-                    thread = gmail_service.users().threads().get(
-                        userId="me",
-                        id=thread_id,
-                        format="minimal"
-                    ).execute()
-                    # Search all messages in thread for order ID
-                    for thread_msg in thread.get("messages", []):
-                        snippet = thread_msg.get("snippet", "")
-                        order_match = re.search(r'(\d{3}-\d{7}-\d{7})', snippet)
-                        if order_match:
-                            order_id = order_match.group(1)
-                            break
-                except Exception as e:
-                    print(f"Error fetching thread {thread_id}: {e}")
+            order_id = _thread_order_cache.get(email.get("thread_id"))
 
             if order_id:
                 # This is a reply in a categorization thread - process as correction
-                email["_is_correction"] = True
-                email["_order_id"] = order_id
-                emails.append(email)
+                candidates[msg_id] = order_id
                 print(f"Found reply in order thread {order_id}: {subject[:50]}")
             else:
                 print(f"Skipping reply (no order ID in thread): {subject[:50]}")
             continue
 
         # Skip emails sent from the receipts inbox (our own emails)
-        # Import receipts email from config (falls back to checking email_address from notification)
-        try:
-            from config_private import RECEIPTS_EMAIL
-            receipts_email = RECEIPTS_EMAIL.lower()
-        except ImportError:
-            receipts_email = email_address.lower() if email_address else ""
-
         if receipts_email and receipts_email in from_addr:
             print(f"Skipping self-sent: {subject[:50]}")
             continue
 
-        # Check if Amazon-related
-        body = (email.get("html_body", "") + email.get("text_body", "")).lower()
-        is_amazon = (
-            "amazon.com" in from_addr or
-            ("amazon" in body and ("order" in subject_lower or "shipped" in subject_lower or "ordered" in subject_lower))
+        # Amazon senders are in; otherwise an order-like subject still needs
+        # the body to mention Amazon (checked after the full fetch)
+        if "amazon.com" in from_addr:
+            candidates[msg_id] = None
+        elif AMAZON_SUBJECT_PATTERN.search(subject):
+            candidates[msg_id] = None
+            needs_body_check.add(msg_id)
+        else:
+            print(f"Skipping non-Amazon: {subject[:50]}")
+
+    # Stage 2: full bodies, only for the emails that passed triage
+    emails = []
+    for email in fetch_emails_by_ids(gmail_service, list(candidates)):
+        msg_id = email["id"]
+        subject = email.get("subject", "")
+        order_id = candidates[msg_id]
+
+        if order_id:
+            email["_is_correction"] = True
+            email["_order_id"] = order_id
+            email["_from_lower"] = from_lower[msg_id]
+            emails.append(email)
+            continue
+
+        # Plain text first: it is smaller, and the HTML is only decoded if needed
+        is_amazon = msg_id not in needs_body_check or (
+            AMAZON_BODY_PATTERN.search(get_email_body(email, "text_body")) is not None or
+            AMAZON_BODY_PATTERN.search(get_email_body(email, "html_body")) is not None
         )
 
         if is_amazon:
@@ -1007,6 +1750,40 @@ def fetch_emails_from_history(gmail_service, notification_history_id: str) -> li
     return emails
 
 
+class EmailWrapper:
+    """Minimal RawEmail-like view of an email dict, for AmazonEmailParser."""
+
+    def __init__(self, data, parsed_date):
+        self.uid = data.get("id", "")
+        self.message_id = data.get("message_id", "")
+        self.subject = data.get("subject", "")
+        self.from_addr = data.get("from", "")
+        self.date = parsed_date
+        self.html_body = get_email_body(data, "html_body")
+        self.text_body = get_email_body(data, "text_body")
+
+
+class CreatedTransaction(NamedTuple):
+    """Transaction-like stand-in for a transaction we just created in YNAB."""
+    transaction_id: str
+    amount: Decimal
+    date: datetime
+    payee_name: str
+    account_id: str
+
+
+# order_id -> lock held while an order's YNAB transaction is looked up,
+# created or corrected, so concurrent push workers can't race on one order
+_order_locks = {}
+_order_locks_guard = threading.Lock()
+
+
+def order_lock(order_id: str) -> threading.Lock:
+    """Get the per-instance lock serializing YNAB work for an order."""
+    with _order_locks_guard:
+        return _order_locks.setdefault(order_id, threading.Lock())
+
+
 def process_email_and_reply(
     email_data: dict,
     gmail_service,
@@ -1030,23 +1807,21 @@ def process_email_and_reply(
     parser = AmazonEmailParser(client=claude)
 
     # Parse original email date from forwarded message
-    from zoneinfo import ZoneInfo
-    from email.utils import parsedate_to_datetime
-
-    eastern = ZoneInfo("America/New_York")
-
     def extract_original_date(email_data: dict) -> Optional[datetime]:
         """Extract the original email date from a forwarded message."""
         # Look for "Date:" in the forwarded message header block
         # Gmail format: "---------- Forwarded message ---------\nFrom: ...\nDate: Fri, Jan 10, 2025 at 3:45 PM\n..."
-        body = email_data.get("text_body", "") or email_data.get("html_body", "")
-
-        # Try to find Date: line in forwarded header
-        date_match = re.search(r'Date:\s*(.+?)(?:\n|<br|$)', body, re.IGNORECASE)
+        # Try to find Date: line in forwarded header, in the plain text part
+        # first; each part is scanned on its own and the HTML only if needed
+        date_match = None
+        for key in ("text_body", "html_body"):
+            date_match = FORWARDED_DATE_PATTERN.search(get_email_body(email_data, key))
+            if date_match:
+                break
         if date_match:
             date_str = date_match.group(1).strip()
             # Clean up HTML entities and tags
-            date_str = re.sub(r'<[^>]+>', '', date_str)
+            date_str = HTML_TAG_PATTERN.sub('', date_str)
             date_str = date_str.replace('&nbsp;', ' ').strip()
             try:
                 # Try standard email date format first
@@ -1056,7 +1831,6 @@ def process_email_and_reply(
                 try:
                     # Remove "at" and parse
                     date_str = date_str.replace(' at ', ' ')
-                    from dateutil import parser as date_parser
                     return date_parser.parse(date_str)
                 except Exception:
                     pass
@@ -1074,35 +1848,28 @@ def process_email_and_reply(
                 email_datetime = parsedate_to_datetime(email_date_str)
                 print(f"Using forward date: {email_datetime}")
             else:
-                email_datetime = datetime.now(eastern)
+                email_datetime = datetime.now(EASTERN_TZ)
                 print(f"No date found, using current Eastern time: {email_datetime}")
         except Exception as e:
             print(f"Error parsing date '{email_date_str}': {e}, using Eastern time")
-            email_datetime = datetime.now(eastern)
-
-    # Create a minimal RawEmail-like object for parsing
-    class EmailWrapper:
-        def __init__(self, data, parsed_date):
-            self.uid = data.get("id", "")
-            self.message_id = data.get("message_id", "")
-            self.subject = data.get("subject", "")
-            self.from_addr = data.get("from", "")
-            self.date = parsed_date
-            self.html_body = data.get("html_body", "")
-            self.text_body = data.get("text_body", "")
+            email_datetime = datetime.now(EASTERN_TZ)
 
     email = EmailWrapper(email_data, email_datetime)
-    try:
-        parsed = parser.parse_email(email)
-    except Exception as e:
-        error_str = str(e)
-        if "ANTHROPIC_ERROR:quota_exhausted" in error_str:
-            print("ALERT: Anthropic API quota exhausted!")
-            return {"status": "error", "message": "Anthropic quota exhausted - please add credits", "alert": True}
-        elif "ANTHROPIC_ERROR:rate_limited" in error_str:
-            print("ALERT: Anthropic API rate limited!")
-            return {"status": "error", "message": "Anthropic rate limited - try again later", "alert": True}
-        raise
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        # The YNAB lookups don't depend on the parsed order, so load them
+        # while Claude parses the email
+        executor.submit(warm_ynab_state)
+        try:
+            parsed = parser.parse_email(email)
+        except Exception as e:
+            error_str = str(e)
+            if "ANTHROPIC_ERROR:quota_exhausted" in error_str:
+                print("ALERT: Anthropic API quota exhausted!")
+                return {"status": "error", "message": "Anthropic quota exhausted - please add credits", "alert": True}
+            elif "ANTHROPIC_ERROR:rate_limited" in error_str:
+                print("ALERT: Anthropic API rate limited!")
+                return {"status": "error", "message": "Anthropic rate limited - try again later", "alert": True}
+            raise
 
     if not parsed:
         return {"status": "error", "message": "Could not parse email"}
@@ -1122,7 +1889,7 @@ def process_email_and_reply(
     # Check YNAB directly for existing order (by memo containing order ID)
     ynab = get_ynab_client()
     budget_name = get_budget_name()
-    budget_id = ynab.get_budget_id(budget_name)
+    budget_id = get_budget_id(ynab, budget_name)
 
     if not budget_id:
         error_msg = f"Budget '{budget_name}' not found"
@@ -1139,156 +1906,143 @@ def process_email_and_reply(
             )
         return {"status": "error", "message": error_msg}
 
-    # Check if order already exists in YNAB by looking for memo with order ID
-    since_date = (email_datetime - timedelta(days=30)).strftime("%Y-%m-%d")
-    existing = ynab.find_transaction_by_memo(budget_id, parsed.order_id, since_date=since_date)
-    if existing:
-        # Verify the transaction still exists (might have been deleted)
-        if ynab.transaction_exists(budget_id, existing.transaction_id):
+    # Receipts for the same order (e.g. "Ordered" and "Shipped") can arrive in
+    # one push; serialize them so only one creates the YNAB transaction
+    with order_lock(parsed.order_id):
+        # Check if order already exists in YNAB by looking for memo with order ID
+        since_date = (email_datetime - timedelta(days=30)).strftime("%Y-%m-%d")
+        # (the index is refreshed on every lookup, so deleted transactions are already gone)
+        existing = find_order_transaction(ynab, budget_id, parsed.order_id, since_date)
+        if existing:
             return {"status": "skipped", "message": f"Order {parsed.order_id} already in YNAB (transaction {existing.transaction_id})"}
-        else:
-            print(f"Found memo match but transaction {existing.transaction_id} was deleted - proceeding")
-
-    print(f"Processing order {parsed.order_id} - ${parsed.total}")
 
-    order = parsed_order_to_amazon_order(parsed)
+        print(f"Processing order {parsed.order_id} - ${parsed.total}")
 
-    # Use date from original email (forwarded email's Date header)
-    transaction_date = email_datetime.strftime("%Y-%m-%d")
-    transaction = find_matching_transaction(ynab, budget_id, order)
+        order = parsed_order_to_amazon_order(parsed)
 
-    result: Optional[CategorizationResult] = None
+        # Use date from original email (forwarded email's Date header)
+        transaction_date = email_datetime.strftime("%Y-%m-%d")
+        transaction = find_matching_transaction(ynab, budget_id, order)
 
-    # Get categories for categorization (exclude certain groups)
-    all_categories = ynab.get_categories(budget_id)
-    excluded_groups = ['library renovation']
-    categories = [c for c in all_categories
-                  if c.group_name.lower() not in excluded_groups]
+        result: Optional[CategorizationResult] = None
 
-    # Determine flag color based on whether we matched or created
-    if transaction:
-        # Verify the transaction still exists (might have been deleted)
-        if not ynab.transaction_exists(budget_id, transaction.transaction_id):
-            print(f"Matched transaction {transaction.transaction_id} no longer exists - will create new")
-            transaction = None
+        # Get categories for categorization (exclude certain groups)
+        categories, cat_lookup, cat_id_to_name = get_category_index(ynab, budget_id)
 
-    if transaction:
-        print(f"Found matching transaction: ${abs(transaction.amount)} on {transaction.date}")
-        flag_color = FLAG_MATCHED
-    else:
-        print(f"No matching YNAB transaction for order {parsed.order_id} - creating new transaction")
-        # Create a new transaction
-        account_id = get_default_account_id(ynab, budget_id)
-        if not account_id:
-            error_msg = "No account found to create transaction"
-            print(error_msg)
-            return {"status": "error", "message": error_msg}
+        # Determine flag color based on whether we matched or created
+        if transaction:
+            # Verify the transaction still exists (might have been deleted)
+            if not ynab.transaction_exists(budget_id, transaction.transaction_id):
+                print(f"Matched transaction {transaction.transaction_id} no longer exists - will create new")
+                transaction = None
 
-        writer = YNABWriter(ynab)
-        created = writer.create_transaction(
-            budget_id=budget_id,
-            account_id=account_id,
-            date=transaction_date,  # Use Eastern time
-            amount=-parsed.total,  # Negative for outflow
-            payee_name="Amazon.com",
-            memo=f"Order {parsed.order_id}",
-            flag_color=FLAG_CREATED,  # Yellow flag for auto-created
-            approved=False,
-        )
-        if not created or not created.get("id"):
-            error_msg = f"Failed to create transaction for order {parsed.order_id}"
-            print(error_msg)
-            return {"status": "error", "message": error_msg}
-
-        # Create a transaction-like object for categorization
-        from dataclasses import dataclass
-
-        @dataclass
-        class CreatedTransaction:
-            transaction_id: str
-            amount: Decimal
-            date: datetime
-            payee_name: str
-            account_id: str
-
-        transaction = CreatedTransaction(
-            transaction_id=created["id"],
-            amount=-parsed.total,
-            date=parsed.order_date,
-            payee_name="Amazon.com",
-            account_id=account_id,
-        )
-        flag_color = FLAG_CREATED
-        print(f"Created transaction {transaction.transaction_id}")
-
-    # Check if this is a grocery order (Whole Foods, Amazon Fresh)
-    subject_lower = email_data.get("subject", "").lower()
-    from_lower = email_data.get("from", "").lower()
-    is_grocery = any(
-        grocery in subject_lower or grocery in from_lower
-        for grocery in GROCERY_PAYEES
-    )
-
-    if is_grocery:
-        # Find Groceries category
-        groceries_cat = next(
-            (c for c in categories if c.name.lower() == "groceries"),
-            None
-        )
-        if groceries_cat:
-            print(f"Grocery order detected - categorizing as Groceries")
-            result = categorize_simple(order, groceries_cat.category_id, groceries_cat.name)
+        if transaction:
+            print(f"Found matching transaction: ${abs(transaction.amount)} on {transaction.date}")
+            flag_color = FLAG_MATCHED
         else:
-            print(f"Grocery order but no Groceries category found - using AI categorization")
-            result = categorize_order(order=order, categories=categories, client=claude)
-    else:
-        # Categorize the order using AI
-        result = categorize_order(order=order, categories=categories, client=claude)
-
-    # Apply to YNAB
-    if apply_categorization(ynab, budget_id, transaction, result, flag_color=flag_color):
-        # Build YNAB account URL (YNAB doesn't support deep links to individual transactions)
-        ynab_url = None
-        if hasattr(transaction, 'account_id') and transaction.account_id:
-            ynab_url = f"https://app.ynab.com/{budget_id}/accounts/{transaction.account_id}"
-
-        # Send success email to both forwarder and receipts inbox
-        if gmail_service and recipients:
-            send_summary_email(
-                gmail_service=gmail_service,
-                to=recipients,
-                order_id=parsed.order_id,
-                order_total=parsed.total,
-                result=result,
-                matched=True,
-                in_reply_to=email_data.get("message_id"),
-                original_subject=email_data.get("subject"),
-                thread_id=thread_id,
-                ynab_url=ynab_url,
+            print(f"No matching YNAB transaction for order {parsed.order_id} - creating new transaction")
+            # Create a new transaction
+            account_id = get_default_account_id(ynab, budget_id)
+            if not account_id:
+                error_msg = "No account found to create transaction"
+                print(error_msg)
+                return {"status": "error", "message": error_msg}
+
+            writer = get_ynab_writer()
+            created = writer.create_transaction(
+                budget_id=budget_id,
+                account_id=account_id,
+                date=transaction_date,  # Use Eastern time
+                amount=-parsed.total,  # Negative for outflow
+                payee_name="Amazon.com",
+                memo=f"Order {parsed.order_id}",
+                flag_color=FLAG_CREATED,  # Yellow flag for auto-created
+                approved=False,
             )
-
-        return {
-            "status": "categorized",
-            "message": f"Order {parsed.order_id} categorized and applied to YNAB",
-            "order_id": parsed.order_id,
-            "transaction_id": transaction.transaction_id,
-        }
-    else:
-        error_msg = f"Failed to apply categorization for {parsed.order_id}"
-
-        if gmail_service and recipients:
-            send_summary_email(
-                gmail_service=gmail_service,
-                to=recipients,
-                order_id=parsed.order_id,
-                order_total=parsed.total,
-                error=error_msg,
-                in_reply_to=email_data.get("message_id"),
-                original_subject=email_data.get("subject"),
-                thread_id=thread_id,
+            if not created or not created.get("id"):
+                error_msg = f"Failed to create transaction for order {parsed.order_id}"
+                print(error_msg)
+                return {"status": "error", "message": error_msg}
+
+            # Create a transaction-like object for categorization
+            transaction = CreatedTransaction(
+                transaction_id=created["id"],
+                amount=-parsed.total,
+                date=parsed.order_date,
+                payee_name="Amazon.com",
+                account_id=account_id,
             )
+            flag_color = FLAG_CREATED
+            print(f"Created transaction {transaction.transaction_id}")
+
+        # Items covered by learned rules don't need Claude
+        ruled = apply_category_rules(order)
+        if ruled:
+            print(f"Assigned {len(ruled)} item(s) from learned category rules")
+
+        # Check if this is a grocery order (Whole Foods, Amazon Fresh)
+        is_grocery = (
+            GROCERY_PATTERN.search(email_data.get("subject", "")) is not None or
+            GROCERY_PATTERN.search(email_data.get("from", "")) is not None
+        )
 
-        return {"status": "error", "message": error_msg}
+        if is_grocery:
+            # Find Groceries category
+            groceries_id = cat_lookup.get("groceries")
+            if groceries_id:
+                print(f"Grocery order detected - categorizing as Groceries")
+                result = categorize_simple(order, groceries_id, cat_id_to_name[groceries_id])
+            else:
+                print(f"Grocery order but no Groceries category found - using AI categorization")
+                result = categorize_order(order=order, categories=categories, client=claude, preassigned=ruled)
+        else:
+            # Categorize the order using AI
+            result = categorize_order(order=order, categories=categories, client=claude, preassigned=ruled)
+
+        # Apply to YNAB
+        if apply_categorization(budget_id, transaction, result, flag_color=flag_color):
+            # Build YNAB account URL (YNAB doesn't support deep links to individual transactions)
+            ynab_url = None
+            if hasattr(transaction, 'account_id') and transaction.account_id:
+                ynab_url = f"https://app.ynab.com/{budget_id}/accounts/{transaction.account_id}"
+
+            # Send success email to both forwarder and receipts inbox
+            if gmail_service and recipients:
+                send_summary_email(
+                    gmail_service=gmail_service,
+                    to=recipients,
+                    order_id=parsed.order_id,
+                    order_total=parsed.total,
+                    result=result,
+                    matched=True,
+                    in_reply_to=email_data.get("message_id"),
+                    original_subject=email_data.get("subject"),
+                    thread_id=thread_id,
+                    ynab_url=ynab_url,
+                )
+
+            return {
+                "status": "categorized",
+                "message": f"Order {parsed.order_id} categorized and applied to YNAB",
+                "order_id": parsed.order_id,
+                "transaction_id": transaction.transaction_id,
+            }
+        else:
+            error_msg = f"Failed to apply categorization for {parsed.order_id}"
+
+            if gmail_service and recipients:
+                send_summary_email(
+                    gmail_service=gmail_service,
+                    to=recipients,
+                    order_id=parsed.order_id,
+                    order_total=parsed.total,
+                    error=error_msg,
+                    in_reply_to=email_data.get("message_id"),
+                    original_subject=email_data.get("subject"),
+                    thread_id=thread_id,
+                )
+
+            return {"status": "error", "message": error_msg}
 
 
 @functions_framework.cloud_event
@@ -1307,6 +2061,23 @@ def process_gmail_push(cloud_event: CloudEvent) -> None:
 
     print(f"New mail for {email_address}, history ID: {history_id}")
 
+    # Gmail fires bursts of notifications; only the first instance does the work
+    if history_id and not claim_history_id(history_id):
+        return
+
+    try:
+        _process_history(history_id, email_address)
+    except Exception:
+        # Let the Pub/Sub retry claim this ID instead of backing off from it
+        if history_id:
+            release_history_id(history_id)
+        raise
+
+
+def _process_history(history_id, email_address: str) -> None:
+    """Fetch and process the Amazon emails for one push notification."""
+    prefetch_secrets()
+
     # Get Gmail service
     try:
         gmail_service = get_gmail_service()
@@ -1319,48 +2090,74 @@ def process_gmail_push(cloud_event: CloudEvent) -> None:
 
     # Fetch emails from history using the notification's historyId
     # YNAB memo check will skip already-processed orders
-    emails = fetch_emails_from_history(gmail_service, history_id)
+    emails = fetch_emails_from_history(gmail_service, history_id, email_address)
     print(f"Processing {len(emails)} Amazon email(s)")
 
-    # Process each email
+    # Drop receipts already processed (prevents race condition duplicates).
+    # Corrections skip this: their claim happens in process_correction_reply.
+    processed = get_processed_email_ids(
+        [e.get("id") for e in emails if not e.get("_is_correction") and e.get("id")]
+    )
+    pending = []
     for email_data in emails:
-        email_id = email_data.get("id")
+        if not email_data.get("_is_correction") and email_data.get("id") in processed:
+            print(f"Skipping already processed email: {email_data.get('id')}")
+        else:
+            pending.append(email_data)
+    emails = pending
+
+    # Each email is an independent Gmail -> Claude -> YNAB pipeline, so a
+    # batch runs concurrently; Firestore claims keep the workers from
+    # double-processing the same email, and order_lock serializes the YNAB
+    # steps for emails about the same order
+    if len(emails) <= 1:
+        for email_data in emails:
+            _process_pushed_email(email_data, gmail_service, email_address)
+        return
+
+    def worker(email_data):
+        try:
+            _process_pushed_email(email_data, get_thread_gmail_service(), email_address)
+        except Exception as e:
+            print(f"Error processing email {email_data.get('id')}: {e}")
+
+    with ThreadPoolExecutor(max_workers=min(PUSH_EMAIL_WORKERS, len(emails))) as executor:
+        list(executor.map(worker, emails))
+
 
-        # Check if this is a correction reply
-        if email_data.get("_is_correction"):
-            order_id = email_data.get("_order_id")
-            print(f"Processing correction reply for order {order_id}")
+def _process_pushed_email(email_data: dict, gmail_service, email_address: str) -> None:
+    """Handle one email from a push notification: correction reply or new receipt."""
+    # Check if this is a correction reply
+    if email_data.get("_is_correction"):
+        order_id = email_data.get("_order_id")
+        print(f"Processing correction reply for order {order_id}")
+        with order_lock(order_id):
             result = process_correction_reply(
                 gmail_service=gmail_service,
                 email_data=email_data,
                 order_id=order_id,
             )
-            print(f"Correction result: {result}")
-            continue
-
-        # Check if already processed (prevents race condition duplicates)
-        if is_email_processed(email_id):
-            print(f"Skipping already processed email: {email_id}")
-            continue
+        print(f"Correction result: {result}")
+        return
 
-        # Extract forwarder's email address
-        from_addr = email_data.get("from", "")
-        forwarder_email = None
-        if from_addr and "@" in from_addr:
-            # Extract email from "Name <email>" format if needed
-            if "<" in from_addr and ">" in from_addr:
-                match = re.search(r'<([^>]+)>', from_addr)
-                forwarder_email = match.group(1) if match else from_addr
-            else:
-                forwarder_email = from_addr
+    # Extract forwarder's email address
+    from_addr = email_data.get("from", "")
+    forwarder_email = None
+    if from_addr and "@" in from_addr:
+        # Extract email from "Name <email>" format if needed
+        if "<" in from_addr and ">" in from_addr:
+            match = ANGLE_ADDRESS_PATTERN.search(from_addr)
+            forwarder_email = match.group(1) if match else from_addr
+        else:
+            forwarder_email = from_addr
 
-        result = process_email_and_reply(
-            email_data=email_data,
-            gmail_service=gmail_service,
-            reply_to=forwarder_email,  # Person who forwarded
-            receipts_email=email_address,  # Receipts inbox for visibility
-        )
-        print(f"Processed email: {result}")
+    result = process_email_and_reply(
+        email_data=email_data,
+        gmail_service=gmail_service,
+        reply_to=forwarder_email,  # Person who forwarded
+        receipts_email=email_address,  # Receipts inbox for visibility
+    )
+    print(f"Processed email: {result}")
 
 
 # OAuth configuration
@@ -1405,8 +2202,7 @@ def oauth_start(request):
 
     # Store state in Firestore for validation (expires in 10 minutes)
     try:
-        from google.cloud import firestore
-        db = firestore.Client(project=project_id)
+        db = get_firestore_client()
         db.collection("oauth_states").document(state).set({
             "created": datetime.now().isoformat(),
             "valid": True,
@@ -1459,8 +2255,7 @@ def oauth_callback(request):
     # Validate state (CSRF protection)
     project_id = os.getenv("GCP_PROJECT_ID")
     try:
-        from google.cloud import firestore
-        db = firestore.Client(project=project_id)
+        db = get_firestore_client()
         state_doc = db.collection("oauth_states").document(state).get()
         if not state_doc.exists or not state_doc.to_dict().get("valid"):
             return {"error": "Invalid state parameter"}, 400
@@ -1515,12 +2310,10 @@ def oauth_callback(request):
 
     # Store in Secret Manager (update existing secret)
     try:
-        from google.cloud import secretmanager
-        client = secretmanager.SecretManagerServiceClient()
         parent = f"projects/{project_id}/secrets/gmail-oauth-token"
 
         # Add new version
-        client.add_secret_version(
+        get_secret_client().add_secret_version(
             request={
                 "parent": parent,
                 "payload": {"data": json.dumps(token_data).encode("UTF-8")},
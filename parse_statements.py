@@ -1,37 +1,137 @@
 """Parse Chase Amazon credit card statement PDFs and cache transactions."""
 
+import hashlib
+import importlib
 import json
 import re
 import os
 from datetime import datetime
+import shutil
 import subprocess
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from utils import get_cache_dir
+
+# Transaction line (MM/DD, merchant, amount), optionally followed by an
+# "Order Number" line. Matched across the whole statement in one pass;
+# [^\S\n] is whitespace that stays within a line. Lines are anchored on a
+# literal newline rather than ^ so the engine can jump between line starts
+# instead of trying every character; the text is scanned with one prepended.
+TRANSACTION_PATTERN = re.compile(
+    r'\n[^\S\n]*(\d{2}/\d{2})[^\S\n]+(.+?)[^\S\n]+(\d+\.\d{2})[^\S\n]*$'
+    r'(?:\n[^\n]*?Order Number[^\S\n]+(\S+)[^\n]*)?',
+    re.MULTILINE
+)
+
+# Keywords that mark payments and non-purchase transaction types. One pass
+# collects which groups appear; precedence is applied afterwards. The
+# lookahead keeps matches zero-width so overlapping keywords (e.g. TIPAYMENT)
+# are all found.
+TRANSACTION_KEYWORD_PATTERN = re.compile(
+    r'(?=(?P<payment>Payment|PAYMENT)|(?P<tip>Tip|TIP)'
+    r'|(?P<digital>Prime Video|AMZN Digital)|(?P<prime_membership>Prime\*))'
+)
+
+# Probe for pdftotext once per process rather than per PDF
+PDFTOTEXT_PATH = shutil.which('pdftotext')
+
+# Optional PDF libraries: module name -> module, or None if not installed
+_optional_modules = {}
+
+# PDFium isn't thread-safe; all pypdfium2 calls go through this lock
+_pdfium_lock = threading.Lock()
+
+
+def _import_optional(name):
+    """Import an optional PDF library once; return None if it isn't installed."""
+    if name not in _optional_modules:
+        try:
+            _optional_modules[name] = importlib.import_module(name)
+        except ImportError:
+            _optional_modules[name] = None
+    return _optional_modules[name]
+
+def _pdf_text_cache_path(pdf_path, extractor):
+    """Cache file for a PDF's extracted text, keyed by path, mtime, size and extractor."""
+    stat = os.stat(pdf_path)
+    key = hashlib.blake2b(
+        f"{pdf_path}:{stat.st_mtime_ns}:{stat.st_size}:{extractor}".encode(), digest_size=16
+    ).hexdigest()
+    return get_cache_dir() / "pdftext" / f"{key}.txt"
+
+def _available_extractors():
+    """Extractors _extract_pdf_text can use here, in the order it tries them."""
+    extractors = []
+    if PDFTOTEXT_PATH:
+        extractors.append('pdftotext')
+    if _import_optional('pypdfium2'):
+        extractors.append('pypdfium2')
+    if _import_optional('PyPDF2'):
+        extractors.append('PyPDF2')
+    return extractors
 
 def parse_pdf_text(pdf_path):
-    """Extract text from PDF using pdftotext or similar."""
-    # Use pdftotext if available, otherwise fall back to PyPDF2
+    """Extract text from PDF, reusing the on-disk copy from a previous run."""
+    # Extractors lay text out differently, so each one caches separately.
+    # Check them in fallback order: a PDF pdftotext fails on is cached under
+    # whichever extractor handled it.
     try:
+        for extractor in _available_extractors():
+            cache_path = _pdf_text_cache_path(pdf_path, extractor)
+            if cache_path.exists():
+                return cache_path.read_text()
+    except OSError:
+        return _extract_pdf_text(pdf_path)[0]
+
+    text, extractor = _extract_pdf_text(pdf_path)
+    if text:
+        cache_path = _pdf_text_cache_path(pdf_path, extractor)
+        cache_path.parent.mkdir(parents=True, exist_ok=True)
+        cache_path.write_text(text)
+    return text
+
+def _extract_pdf_text(pdf_path):
+    """Extract text from PDF using pdftotext or similar.
+
+    Returns (text, name of the extractor that produced it).
+    """
+    # Prefer pdftotext: the transaction line pattern relies on its -layout output
+    if PDFTOTEXT_PATH:
         result = subprocess.run(
-            ['pdftotext', '-layout', pdf_path, '-'],
+            [PDFTOTEXT_PATH, '-layout', pdf_path, '-'],
             capture_output=True, text=True
         )
         if result.returncode == 0:
-            return result.stdout
-    except FileNotFoundError:
-        pass
-
-    # Fallback: try PyPDF2
-    try:
-        import PyPDF2
+            return result.stdout, 'pdftotext'
+
+    # Fallback: pypdfium2 extracts in-process, much faster than PyPDF2
+    pdfium = _import_optional('pypdfium2')
+    if pdfium:
+        with _pdfium_lock:
+            pdf = pdfium.PdfDocument(pdf_path)
+            try:
+                return '\n'.join(_pdfium_page_text(page) for page in pdf), 'pypdfium2'
+            finally:
+                pdf.close()
+
+    # Last resort: PyPDF2
+    PyPDF2 = _import_optional('PyPDF2')
+    if PyPDF2:
         with open(pdf_path, 'rb') as f:
             reader = PyPDF2.PdfReader(f)
-            text = ''
-            for page in reader.pages:
-                text += page.extract_text() + '\n'
-            return text
-    except ImportError:
-        pass
+            return ''.join(page.extract_text() + '\n' for page in reader.pages), 'PyPDF2'
+
+    return None, None
 
-    return None
+def _pdfium_page_text(page):
+    """Extract one pdfium page's text, releasing its native buffers right away."""
+    textpage = page.get_textpage()
+    try:
+        return textpage.get_text_range()
+    finally:
+        textpage.close()
+        page.close()
 
 def parse_statement_transactions(text, statement_date):
     """Parse transactions from statement text."""
@@ -40,64 +140,51 @@ def parse_statement_transactions(text, statement_date):
     # Pattern for transaction lines like:
     # 07/04 Amazon.com*ZA1E20LW3 Amzn.com/bill WA 52.39
     # Order Number 114-6583471-1349821
+    stmt_month, _, stmt_year = statement_date.split('/')
+    stmt_month = int(stmt_month)
+    stmt_year = int(stmt_year)
+
+    for match in TRANSACTION_PATTERN.finditer('\n' + text):
+        date_str = match.group(1)
+        description = match.group(2).strip()
+        # Amount is always d+.dd, so dropping the point gives exact cents
+        amount_cents = int(match.group(3).replace('.', ''))
+
+        keywords = {m.lastgroup for m in TRANSACTION_KEYWORD_PATTERN.finditer(description)}
 
-    lines = text.split('\n')
-    i = 0
-    while i < len(lines):
-        line = lines[i].strip()
-
-        # Look for transaction line pattern: MM/DD followed by merchant and amount
-        match = re.match(r'^(\d{2}/\d{2})\s+(.+?)\s+(\d+\.\d{2})$', line)
-        if match:
-            date_str = match.group(1)
-            description = match.group(2).strip()
-            amount = float(match.group(3))
-
-            # Skip payments (negative amounts are credits)
-            if 'Payment' in description or 'PAYMENT' in description:
-                i += 1
-                continue
-
-            # Look for order number on next line
-            order_number = None
-            if i + 1 < len(lines):
-                next_line = lines[i + 1].strip()
-                order_match = re.search(r'Order Number\s+(\S+)', next_line)
-                if order_match:
-                    order_number = order_match.group(1)
-                    i += 1  # Skip the order number line
-
-            # Determine year from statement date
-            month = int(date_str.split('/')[0])
-            stmt_month = int(statement_date.split('/')[0])
-            stmt_year = int(statement_date.split('/')[2])
-
-            # If transaction month > statement month, it's from previous year
-            if month > stmt_month:
-                year = stmt_year - 1
-            else:
-                year = stmt_year
-
-            full_date = f"{year}-{date_str.replace('/', '-')}"
-
-            # Classify transaction type
-            tx_type = 'purchase'
-            if 'Tip' in description or 'TIP' in description:
-                tx_type = 'tip'
-            elif 'Prime Video' in description or 'AMZN Digital' in description:
-                tx_type = 'digital'
-            elif 'Prime*' in description and 'Prime Video' not in description:
-                tx_type = 'prime_membership'
-
-            transactions.append({
-                'date': full_date,
-                'description': description,
-                'amount': amount,
-                'order_number': order_number,
-                'type': tx_type
-            })
-
-        i += 1
+        # Skip payments (negative amounts are credits)
+        if 'payment' in keywords:
+            continue
+
+        # Order number from the following line, if present
+        order_number = match.group(4)
+
+        # Determine year from statement date
+        month = int(date_str[:2])
+
+        # If transaction month > statement month, it's from previous year
+        if month > stmt_month:
+            year = stmt_year - 1
+        else:
+            year = stmt_year
+
+        full_date = f"{year}-{date_str.replace('/', '-')}"
+
+        # Classify transaction type
+        tx_type = 'purchase'
+        for kind in ('tip', 'digital', 'prime_membership'):
+            if kind in keywords:
+                tx_type = kind
+                break
+
+        transactions.append({
+            'date': full_date,
+            'description': description,
+            'amount': amount_cents / 100,
+            'amount_cents': amount_cents,
+            'order_number': order_number,
+            'type': tx_type
+        })
 
     return transactions
 
@@ -123,19 +210,24 @@ def main():
 
     all_transactions = {}
 
-    for filename, stmt_date in statement_files:
-        pdf_path = os.path.join(statements_dir, filename)
+    # Extract every statement in parallel; processes rather than threads so the
+    # in-process fallbacks (pure-Python PyPDF2, non-thread-safe PDFium) scale too
+    pdf_paths = [os.path.join(statements_dir, filename) for filename, _ in statement_files]
+    with ProcessPoolExecutor(max_workers=min(len(pdf_paths), os.cpu_count() or 1)) as executor:
+        texts = list(executor.map(parse_pdf_text, pdf_paths))
+
+    for (filename, stmt_date), text in zip(statement_files, texts):
         print(f"Parsing {filename}...")
 
-        text = parse_pdf_text(pdf_path)
         if text:
             transactions = parse_statement_transactions(text, stmt_date)
+            total = sum(t['amount_cents'] for t in transactions) / 100
             all_transactions[stmt_date] = {
                 'filename': filename,
                 'transactions': transactions,
-                'total': sum(t['amount'] for t in transactions)
+                'total': total
             }
-            print(f"  Found {len(transactions)} transactions, total: ${sum(t['amount'] for t in transactions):.2f}")
+            print(f"  Found {len(transactions)} transactions, total: ${total:.2f}")
         else:
             print(f"  Failed to extract text from {filename}")
 
@@ -144,7 +236,7 @@ def main():
         json.dump({
             'generated': datetime.now().isoformat(),
             'statements': all_transactions
-        }, f, indent=2)
+        }, f, separators=(',', ':'))
 
     print(f"\nCache saved to {cache_file}")
 
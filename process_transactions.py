@@ -66,6 +66,8 @@ from datetime import datetime
 import decimal
 from decimal import Decimal
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
 
 import anthropic
@@ -74,14 +76,22 @@ from dotenv import load_dotenv
 from config import CLAUDE_MODEL
 from utils import (
     get_cache_dir,
+    hash_files,
     log,
     extract_order_id,
     is_amazon_transaction,
     is_grocery_transaction,
     load_category_cache,
+    load_keyed_pickle_cache,
     get_cached_category,
     cache_category,
     save_category_cache,
+    response_cache_key,
+    load_response_cache,
+    get_cached_response,
+    cache_response,
+    evict_cached_response,
+    save_response_cache,
 )
 from ynab_client import YNABClient
 
@@ -90,6 +100,12 @@ load_dotenv()
 # Shipping options that indicate grocery/Amazon Fresh/Whole Foods orders
 GROCERY_SHIPPING_OPTIONS = {"scheduled-houdini", "scheduled-one-houdini"}
 
+# Quote, dollar sign and thousands separator stripped from CSV amounts
+CURRENCY_STRIP_TABLE = str.maketrans("", "", "'$,")
+
+# Bump when load_order_history's output format changes to invalidate caches
+ORDER_HISTORY_CACHE_VERSION = 1
+
 
 # =============================================================================
 # GENERIC PROMPT TEMPLATE (committed to repo)
@@ -160,10 +176,11 @@ def get_fallback_category() -> str:
     return rules.get("fallback_category", "Uncategorized")
 
 
-def get_excluded_groups() -> set[str]:
-    """Get category groups to exclude from prompts."""
+@lru_cache(maxsize=1)
+def get_excluded_groups() -> frozenset[str]:
+    """Get category groups to exclude from prompts (rules are fixed per process)."""
     rules = load_category_rules()
-    return set(rules.get("excluded_groups", []))
+    return frozenset(rules.get("excluded_groups", []))
 
 
 def format_category_rules() -> str:
@@ -198,9 +215,10 @@ def format_category_rules() -> str:
 
         # Examples (limit to keep prompt manageable)
         if examples:
-            examples_str = ", ".join(examples[:12])
             if len(examples) > 12:
-                examples_str += "..."
+                examples_str = ", ".join(examples[:12]) + "..."
+            else:
+                examples_str = ", ".join(examples)
             lines.append(f"  Examples: {examples_str}")
 
         # Brands
@@ -238,38 +256,20 @@ def generate_categorization_rules() -> str:
     )
 
 
-def generate_suspicious_rules() -> dict[str, list[str]]:
-    """
-    Generate suspicious categorization rules from the JSON config.
-
-    These are items that should NEVER appear in certain categories,
-    derived from the 'not_this' mappings in the rules.
-    """
-    rules = load_category_rules()
-    categories = rules.get("categories", {})
-    suspicious = {}
-
-    for cat_name, cat_data in categories.items():
-        not_this = cat_data.get("not_this", {})
-        if not_this:
-            # Items that should NOT be in this category
-            keywords = list(not_this.keys())
-            if keywords:
-                suspicious[cat_name] = keywords
-
-    return suspicious
-
-
 # Generate rules at module load time
 CATEGORIZATION_RULES = generate_categorization_rules()
-SUSPICIOUS_RULES = generate_suspicious_rules()
 
 import re
 
+# Emoji at start (common emoji ranges) followed by optional whitespace
+LEADING_EMOJI_PATTERN = re.compile(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*')
+NON_WORD_PATTERN = re.compile(r'\W+')
+
+
+@lru_cache(maxsize=2048)
 def strip_leading_emoji(text: str) -> str:
     """Strip leading emoji and whitespace from a string."""
-    # Match emoji at start (common emoji ranges) followed by optional whitespace
-    return re.sub(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*', '', text)
+    return LEADING_EMOJI_PATTERN.sub('', text)
 
 
 def match_category(cat: str, ynab_categories: list[str]) -> tuple[str, bool]:
@@ -277,84 +277,185 @@ def match_category(cat: str, ynab_categories: list[str]) -> tuple[str, bool]:
     Match a category name to a YNAB category with fuzzy emoji matching.
     Returns (matched_category, was_matched).
     """
+    # Claude returns the same few categories over and over, so memoize
+    return _match_category(cat, tuple(ynab_categories))
+
+
+@lru_cache(maxsize=8)
+def _build_ynab_index(ynab_categories: tuple[str, ...]) -> tuple[set, dict, dict, dict]:
+    """
+    Index YNAB categories for match_category, built once per category list.
+
+    Returns (exact names, lowercased -> category, emoji-stripped lowercased ->
+    (position, category), first word -> [(category, word set), ...]). Only the
+    first category for each key is kept, so lookups pick the same category
+    the old linear scans did.
+    """
+    by_lower = {}
+    by_stripped = {}
+    by_first_word = defaultdict(list)
+    for position, ynab_cat in enumerate(ynab_categories):
+        by_lower.setdefault(ynab_cat.lower(), ynab_cat)
+        ynab_stripped = strip_leading_emoji(ynab_cat).lower()
+        by_stripped.setdefault(ynab_stripped, (position, ynab_cat))
+        ynab_split = ynab_stripped.split()
+        if ynab_split:
+            ynab_words = frozenset(NON_WORD_PATTERN.split(ynab_stripped))
+            by_first_word[ynab_split[0]].append((ynab_cat, ynab_words))
+    return set(ynab_categories), by_lower, by_stripped, dict(by_first_word)
+
+
+@lru_cache(maxsize=4096)
+def _match_category(cat: str, ynab_categories: tuple[str, ...]) -> tuple[str, bool]:
+    """Memoized body of match_category."""
+    exact, by_lower, by_stripped, by_first_word = _build_ynab_index(ynab_categories)
+
     # Exact match
-    if cat in ynab_categories:
+    if cat in exact:
         return cat, True
 
     # Case-insensitive match
     cat_lower = cat.lower()
-    for ynab_cat in ynab_categories:
-        if ynab_cat.lower() == cat_lower:
-            return ynab_cat, True
+    if cat_lower in by_lower:
+        return by_lower[cat_lower], True
 
     # Emoji-stripped match (Claude might return "Gear" instead of "🎒 Gear")
     cat_stripped = strip_leading_emoji(cat).lower()
-    for ynab_cat in ynab_categories:
-        stripped = strip_leading_emoji(ynab_cat)
-        if stripped.lower() == cat_lower or stripped.lower() == cat_stripped:
-            return ynab_cat, True
+    candidates = [by_stripped[key] for key in (cat_lower, cat_stripped) if key in by_stripped]
+    if candidates:
+        return min(candidates)[1], True
 
     # Fuzzy match: if first word matches and they share key words
     # Handles cases like "Pasta & Rices" → "Pasta & Grains"
-    cat_words = set(re.split(r'\W+', cat_lower))
-    for ynab_cat in ynab_categories:
-        ynab_stripped = strip_leading_emoji(ynab_cat).lower()
-        ynab_words = set(re.split(r'\W+', ynab_stripped))
-        # If first word matches and at least half the words overlap
-        cat_first = cat_lower.split()[0] if cat_lower.split() else ""
-        ynab_first = ynab_stripped.split()[0] if ynab_stripped.split() else ""
-        if cat_first and cat_first == ynab_first:
-            overlap = len(cat_words & ynab_words)
-            if overlap >= len(cat_words) / 2:
+    cat_split = cat_lower.split()
+    candidates = by_first_word.get(cat_split[0]) if cat_split else None
+    if candidates:
+        cat_words = frozenset(NON_WORD_PATTERN.split(cat_lower))
+        min_overlap = len(cat_words) / 2
+        for ynab_cat, ynab_words in candidates:
+            # At least half the words overlap
+            if len(cat_words & ynab_words) >= min_overlap:
                 return ynab_cat, True
 
     # No match found
     return cat, False
 
 
-def retry_categorize_item(item: str, ynab_categories: list[str], client, cat_to_group: dict[str, str] | None = None) -> str | None:
-    """Retry categorization for a single item when initial category didn't match."""
-    # Use filtered categories with descriptions (same as main prompt)
-    if cat_to_group:
-        categories_list = format_categories_for_prompt(ynab_categories, cat_to_group)
-    else:
-        categories_list = "\n".join(sorted(ynab_categories))
+# Size, descriptor and brand markers that show up in product names but never
+# in budget categories (plain substring matches, case-insensitive)
+PRODUCT_NAME_PATTERN = re.compile(r',|ounce|oz|pack|count|^organic |365 |by whole foods', re.IGNORECASE)
+
 
-    prompt = f"""Categorize this Amazon product into a budget category.
+def looks_like_product(cat: str) -> bool:
+    """Detect a Claude response that echoed a product name instead of a category."""
+    return len(cat) > 40 or PRODUCT_NAME_PATTERN.search(cat) is not None
 
-Product: {item}
+
+# Static part of the single-item retry prompt, assembled once. It leads the
+# message so the API can cache it across retries.
+RETRY_PROMPT_RULES = f"""Categorize this Amazon product into a budget category.
 
 {CATEGORIZATION_RULES}
 IMPORTANT: Return ONLY the category name from the list below. Do not return the product name.
 
 Valid categories:
-{categories_list}
+"""
+
+
+def cached_prompt_content(static_text: str, request_text: str) -> list[dict]:
+    """Message content with the static prefix marked for prompt caching."""
+    return [
+        {"type": "text", "text": static_text, "cache_control": {"type": "ephemeral"}},
+        {"type": "text", "text": request_text},
+    ]
+
+
+def create_message_text(client, content, max_tokens: int, is_valid=None) -> str | None:
+    """Send one user message to Claude, reusing a cached response for an identical request.
+
+    With is_valid, only responses it accepts are cached, and a cached one it
+    rejects is dropped and re-requested, so an unusable answer (a product
+    name, an unknown category) isn't replayed on every rerun.
+    """
+    key = response_cache_key(CLAUDE_MODEL, max_tokens, content)
+    cached = get_cached_response(key)
+    if cached is not None:
+        if is_valid is None or is_valid(cached):
+            return cached
+        evict_cached_response(key)
+
+    response = client.messages.create(
+        model=CLAUDE_MODEL,
+        max_tokens=max_tokens,
+        messages=[{"role": "user", "content": content}]
+    )
+    if not response.content:
+        return None
+    text = response.content[0].text
+    if is_valid is None or is_valid(text):
+        cache_response(key, text)
+    return text
+
+
+def parse_retry_category(response_text: str, ynab_categories: list[str]) -> str | None:
+    """Match a single-category reply to a YNAB category, or None if it doesn't match."""
+    cat = response_text.strip()
+    # Clean up - strip descriptions/explanations
+    if "(" in cat:
+        cat = cat.split("(")[0].strip()
+    matched_cat, was_matched = match_category(cat, ynab_categories)
+    return matched_cat if was_matched else None
+
+
+def retry_categorize_item(item: str, ynab_categories: list[str], client, cat_to_group: dict[str, str] | None = None) -> str | None:
+    """Retry categorization for a single item when initial category didn't match."""
+    # Use filtered categories with descriptions (same as main prompt)
+    if cat_to_group:
+        categories_list = format_categories_for_prompt(ynab_categories, cat_to_group)
+    else:
+        categories_list = "\n".join(sorted(ynab_categories))
 
-Category:"""
+    content = cached_prompt_content(RETRY_PROMPT_RULES + categories_list, f"Product: {item}\n\nCategory:")
 
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,
-            max_tokens=100,
-            messages=[{"role": "user", "content": prompt}]
+        response_text = create_message_text(
+            client, content, max_tokens=100,
+            is_valid=lambda text: parse_retry_category(text, ynab_categories) is not None,
         )
-        if response.content:
-            cat = response.content[0].text.strip()
-            # Clean up - strip descriptions/explanations
-            if "(" in cat:
-                cat = cat.split("(")[0].strip()
-            matched_cat, was_matched = match_category(cat, ynab_categories)
-            if was_matched:
-                return matched_cat
+        if response_text:
+            return parse_retry_category(response_text, ynab_categories)
     except Exception:
         pass
     return None
 
 
+# Concurrent single-item retries (each is one short Claude request)
+RETRY_WORKERS = 8
+
+# Concurrent chunk requests in batch_categorize_items
+CHUNK_WORKERS = 8
+
+
+def retry_categorize_items(items: list[str], ynab_categories: list[str], client, cat_to_group: dict[str, str] | None = None) -> dict[str, str | None]:
+    """Retry categorization for several items concurrently. Returns item -> category (or None)."""
+    unique_items = list(dict.fromkeys(items))
+    if not unique_items:
+        return {}
+    if len(unique_items) == 1:
+        item = unique_items[0]
+        return {item: retry_categorize_item(item, ynab_categories, client, cat_to_group)}
+
+    def retry(item):
+        return retry_categorize_item(item, ynab_categories, client, cat_to_group)
+
+    with ThreadPoolExecutor(max_workers=min(RETRY_WORKERS, len(unique_items))) as executor:
+        return dict(zip(unique_items, executor.map(retry, unique_items)))
+
+
 # =============================================================================
 # SUSPICIOUS CATEGORIZATION RULES
 # Items matching these patterns should NEVER be in these categories
-# If detected, the item will be resubmitted for recategorization
+# If detected, the item is remapped (SUSPICIOUS_REMAP) or resubmitted for recategorization
 # =============================================================================
 SUSPICIOUS_RULES = {
     # Minimal rules - only catch the most egregious cross-category errors
@@ -367,74 +468,76 @@ SUSPICIOUS_RULES = {
 }
 
 
+# One alternation per category, so each check is a single regex scan
+SUSPICIOUS_PATTERNS = {
+    cat: re.compile("|".join(map(re.escape, keywords)))
+    for cat, keywords in SUSPICIOUS_RULES.items()
+}
+
+
 def is_suspicious_categorization(item: str, category: str) -> bool:
     """Check if an item's categorization seems wrong based on suspicious rules."""
-    item_lower = item.lower()
-
     # Strip emoji from category for matching
-    cat_stripped = re.sub(r'^[\U0001F300-\U0001F9FF\U00002600-\U000027BF]+\s*', '', category)
+    cat_stripped = strip_leading_emoji(category)
 
     # Check both original and stripped category
-    for cat_key in [category, cat_stripped]:
-        if cat_key in SUSPICIOUS_RULES:
-            for keyword in SUSPICIOUS_RULES[cat_key]:
-                if keyword in item_lower:
-                    return True
-    return False
+    patterns = [SUSPICIOUS_PATTERNS[cat_key] for cat_key in (category, cat_stripped) if cat_key in SUSPICIOUS_PATTERNS]
+    if not patterns:
+        return False
+    item_lower = item.lower()
+    return any(pattern.search(item_lower) for pattern in patterns)
 
 
-def log_miscategorization(item: str, original_category: str, new_category: str, cache_dir: Path | None = None):
-    """Log miscategorizations for pattern analysis."""
-    if cache_dir is None:
-        cache_dir = Path("data/processed/chase-amazon")
+# Suspicious categorizations whose fix is unambiguous, remapped locally instead
+# of resubmitting to Claude: category -> {keyword: correct category}
+SUSPICIOUS_REMAP = {
+    "🎒 Gear": {"diaper": "Diapers & Wipes", "wipes": "Diapers & Wipes"},
+    "Household Supplies": {"diaper": "Diapers & Wipes", "wipes": "Diapers & Wipes"},
+}
 
-    log_file = cache_dir / "miscategorization_log.json"
 
-    # Load existing log
-    if log_file.exists():
-        with open(log_file, "r") as f:
-            log_data = json.load(f)
-    else:
-        log_data = {"runs": [], "items": []}
-
-    # Add this miscategorization
-    entry = {
-        "timestamp": datetime.now().isoformat(),
-        "item": item[:100],  # Truncate long names
-        "original_category": original_category,
-        "corrected_category": new_category,
-    }
-    log_data["items"].append(entry)
+def remap_suspicious_item(item: str, original_category: str, ynab_categories: list[str]) -> str | None:
+    """Fix a suspicious categorization without an API call when the answer is known.
 
-    # Save
-    with open(log_file, "w") as f:
-        json.dump(log_data, f, indent=2)
+    Returns the remapped category, or None if the item needs a resubmit.
+    """
+    item_lower = item.lower()
+    for cat_key in (original_category, strip_leading_emoji(original_category)):
+        for keyword, target in SUSPICIOUS_REMAP.get(cat_key, {}).items():
+            if keyword not in item_lower:
+                continue
+            matched_cat, was_matched = match_category(target, ynab_categories)
+            if was_matched and matched_cat != original_category:
+                log(f"  Remap fix: '{item[:50]}' from '{original_category}' → '{matched_cat}'")
+                log_miscategorization(item, original_category, matched_cat)
+                return matched_cat
+    return None
 
 
 def resubmit_suspicious_item(item: str, original_category: str, ynab_categories: list[str], client) -> str:
     """Resubmit a suspicious item for recategorization with focused attention."""
     categories_list = "\n".join(sorted(ynab_categories))
 
-    prompt = f"""This grocery item was categorized as "{original_category}" but that seems incorrect.
-
-Item: {item}
+    content = cached_prompt_content(
+        f"""{CATEGORIZATION_RULES}
 
-Please recategorize this item. Choose the BEST category from this list.
-Return ONLY the exact category name, nothing else.
+Valid categories:
+{categories_list}""",
+        f"""This grocery item was categorized as "{original_category}" but that seems incorrect.
 
-{CATEGORIZATION_RULES}
+Item: {item}
 
-Valid categories:
-{categories_list}"""
+Please recategorize this item. Choose the BEST category from the list above.
+Return ONLY the exact category name, nothing else."""
+    )
 
     try:
-        response = client.messages.create(
-            model=CLAUDE_MODEL,  # Use Haiku for cost efficiency
-            max_tokens=100,
-            messages=[{"role": "user", "content": prompt}]
+        response_text = create_message_text(
+            client, content, max_tokens=100,
+            is_valid=lambda text: match_category(text.strip(), ynab_categories)[1],
         )
-        if response.content:
-            cat = response.content[0].text.strip()
+        if response_text:
+            cat = response_text.strip()
             matched_cat, was_matched = match_category(cat, ynab_categories)
             if was_matched:
                 log(f"  Resubmit fix: '{item[:50]}' from '{original_category}' → '{matched_cat}'")
@@ -493,15 +596,34 @@ def get_ynab_categories() -> tuple[list[str], dict[str, str]]:
         return [], {}
 
 
-def load_category_descriptions() -> tuple[dict[str, str], set[str]]:
+CATEGORY_DESCRIPTIONS_FILE = Path("data/category_descriptions.csv")
+
+
+def _category_descriptions_mtime() -> int:
+    """Modification time of the descriptions CSV (0 if missing), used as a cache key."""
+    try:
+        return CATEGORY_DESCRIPTIONS_FILE.stat().st_mtime_ns
+    except OSError:
+        return 0
+
+
+def load_category_descriptions() -> tuple[dict[str, str], frozenset[str]]:
     """Load category descriptions and excluded categories from CSV file.
 
+    The parsed file is cached until its modification time changes.
+
     Returns:
         Tuple of (descriptions dict, excluded categories set)
     """
+    return _load_category_descriptions(_category_descriptions_mtime())
+
+
+@lru_cache(maxsize=1)
+def _load_category_descriptions(mtime: int) -> tuple[dict[str, str], frozenset[str]]:
+    """Parse the descriptions CSV; mtime only keys the cache."""
     descriptions = {}
     excluded = set()
-    desc_file = Path("data/category_descriptions.csv")
+    desc_file = CATEGORY_DESCRIPTIONS_FILE
     if desc_file.exists():
         with open(desc_file, "r") as f:
             reader = csv.DictReader(f)
@@ -514,7 +636,7 @@ def load_category_descriptions() -> tuple[dict[str, str], set[str]]:
                         descriptions[cat] = desc
                     if exclude == "yes":
                         excluded.add(cat)
-    return descriptions, excluded
+    return descriptions, frozenset(excluded)
 
 
 def format_categories_for_prompt(cat_names: list[str], cat_to_group: dict[str, str]) -> str:
@@ -524,22 +646,31 @@ def format_categories_for_prompt(cat_names: list[str], cat_to_group: dict[str, s
     Also excludes entire category groups that aren't relevant to Amazon purchases
     (loaded from category_rules.json).
     """
+    # Retries format the same category list per item; build it once (and
+    # again only if the descriptions CSV changes)
+    return _format_categories_for_prompt(
+        tuple(cat_names), tuple(sorted(cat_to_group.items())), _category_descriptions_mtime()
+    )
+
+
+@lru_cache(maxsize=8)
+def _format_categories_for_prompt(cat_names: tuple[str, ...], cat_to_group_items: tuple[tuple[str, str], ...],
+                                  descriptions_mtime: int) -> str:
+    """Memoized body of format_categories_for_prompt, keyed by the descriptions CSV mtime."""
+    cat_to_group = dict(cat_to_group_items)
+
     # Load excluded groups from rules file
     excluded_groups = get_excluded_groups()
 
-    descriptions, excluded = load_category_descriptions()
+    descriptions, excluded = _load_category_descriptions(descriptions_mtime)
     lines = []
     excluded_count = 0
     for cat in sorted(cat_names):
         group = cat_to_group.get(cat, "")
 
         # Skip excluded categories (services, subscriptions, bills, etc.)
-        if cat in excluded:
-            excluded_count += 1
-            continue
-
-        # Skip categories in excluded groups
-        if group in excluded_groups:
+        # and categories in excluded groups
+        if cat in excluded or group in excluded_groups:
             excluded_count += 1
             continue
         desc = descriptions.get(cat, "")
@@ -559,6 +690,21 @@ def format_categories_for_prompt(cat_names: list[str], cat_to_group: dict[str, s
     return "\n".join(lines)
 
 
+@lru_cache(maxsize=8192)
+def _parse_total_owed(total_owed: str) -> Decimal:
+    """Parse a "Total Owed" CSV field, treating blanks and junk as zero.
+
+    Order exports repeat the same prices many times, so parsed values are
+    memoized; Decimal is immutable, so sharing instances is safe.
+    """
+    if not total_owed:
+        return Decimal("0")
+    try:
+        return Decimal(total_owed.translate(CURRENCY_STRIP_TABLE))
+    except (ValueError, decimal.InvalidOperation):
+        return Decimal("0")
+
+
 def load_order_history(history_dirs: list[str]) -> dict:
     """Load Amazon order history CSVs into a lookup by order ID.
 
@@ -596,88 +742,77 @@ def load_order_history(history_dirs: list[str]) -> dict:
         log("  Download from: Amazon > Account > Download Your Data > Your Orders")
         return {}
 
-    all_items = []
+    # Sorted so load order (and the cache key) doesn't depend on the filesystem
+    csv_paths = [
+        str(path)
+        for history_dir in valid_dirs
+        for path in sorted(Path(history_dir).rglob("*OrderHistory*.csv"))
+    ]
+
+    # Parsed orders are cached on disk, keyed by a hash of the CSV contents
+    cache_file = get_cache_dir() / "order_history.pkl"
+    cache_key = f"v{ORDER_HISTORY_CACHE_VERSION}-{hash_files(csv_paths)}"
+    orders = load_keyed_pickle_cache(cache_file, cache_key)
+    if orders is not None:
+        log(f"Loaded {len(orders)} unique orders (cached)")
+        return orders
+
+    # Rows are grouped by order and ship date as they are read
+    grouped = {}
+
+    for filepath in csv_paths:
+        log(f"Loading {filepath}...")
+
+        with open(filepath, "r", encoding="utf-8-sig") as csvfile:
+            reader = csv.DictReader(csvfile)
+            for row in reader:
+                order_id = row.get("Order ID", "")
+                if not order_id:
+                    continue
 
-    for history_dir in valid_dirs:
-        for root, _, files in os.walk(history_dir):
-            for f in files:
-                if "OrderHistory" in f and f.endswith(".csv"):
-                    filepath = os.path.join(root, f)
-                    log(f"Loading {filepath}...")
+                product_name = row.get("Product Name", "Unknown Item")
+                total_owed = row.get("Total Owed", "0")
 
-                    with open(filepath, "r", encoding="utf-8-sig") as csvfile:
-                        reader = csv.DictReader(csvfile)
-                        for row in reader:
-                            order_id = row.get("Order ID", "")
-                            if not order_id:
-                                continue
+                total = _parse_total_owed(total_owed)
 
-                            product_name = row.get("Product Name", "Unknown Item")
-                            total_owed = row.get("Total Owed", "0")
-                            tracking = row.get("Carrier Name & Tracking Number", "")
+                # Get shipment date
+                ship_date_str = row.get("Ship Date", "")
+                ship_date = None
+                if ship_date_str:
+                    try:
+                        # Parse ISO format: 2025-01-04T14:02:10Z
+                        ship_date = datetime.fromisoformat(ship_date_str.replace("Z", "+00:00")).date()
+                    except ValueError:
+                        pass
 
-                            try:
-                                total = Decimal(total_owed.replace("'", "").replace("$", "").replace(",", "")) if total_owed else Decimal("0")
-                            except (ValueError, decimal.InvalidOperation):
-                                total = Decimal("0")
-
-                            # Get shipment date
-                            ship_date_str = row.get("Ship Date", "")
-                            ship_date = None
-                            if ship_date_str:
-                                try:
-                                    # Parse ISO format: 2025-01-04T14:02:10Z
-                                    ship_date = datetime.fromisoformat(ship_date_str.replace("Z", "+00:00")).date()
-                                except ValueError:
-                                    pass
-
-                            # Get quantity
-                            qty_str = row.get("Quantity", "1")
-                            try:
-                                qty = int(qty_str) if qty_str else 1
-                            except ValueError:
-                                qty = 1
+                # Get quantity
+                qty_str = row.get("Quantity", "1")
+                try:
+                    qty = int(qty_str) if qty_str else 1
+                except ValueError:
+                    qty = 1
 
-                            # Get shipping option to detect grocery orders
-                            shipping_option = row.get("Shipping Option", "")
+                # Get shipping option to detect grocery orders
+                shipping_option = row.get("Shipping Option", "")
 
-                            all_items.append({
-                                "order_id": order_id,
-                                "name": product_name,
-                                "total": total,
-                                "tracking": tracking,
-                                "ship_date": ship_date,
-                                "quantity": qty,
-                                "shipping_option": shipping_option,
-                            })
+                # Use ship_date as key (None for items without ship date)
+                ship_key = ship_date.isoformat() if ship_date else "unknown"
+                order = grouped.get(order_id)
+                if order is None:
+                    order = grouped[order_id] = {"shipments": defaultdict(list), "items": []}
+                order["shipments"][ship_key].append((ship_date, product_name, total, qty, shipping_option))
+                order["items"].append({"name": product_name, "total": total})
 
     orders = {}
-    order_items = defaultdict(list)
-    for item in all_items:
-        order_items[item["order_id"]].append(item)
-
-    for order_id, items in order_items.items():
-        # Group by ship_date for shipment matching
-        shipment_groups = defaultdict(list)
-        for item in items:
-            # Use ship_date as key (None for items without ship date)
-            ship_key = item["ship_date"].isoformat() if item["ship_date"] else "unknown"
-            shipment_groups[ship_key].append(item)
-
+    for order_id, order in grouped.items():
         shipments = []
-        for ship_key, group_items in shipment_groups.items():
-            shipment_total = sum(item["total"] for item in group_items)
-            ship_date = group_items[0]["ship_date"] if group_items else None
-            # A shipment is grocery if all items have a grocery shipping option
-            is_grocery = all(
-                item.get("shipping_option", "") in GROCERY_SHIPPING_OPTIONS
-                for item in group_items
-            )
+        for group_items in order["shipments"].values():
             shipments.append({
-                "ship_date": ship_date,
-                "total": shipment_total,
-                "items": [{"name": item["name"], "total": item["total"], "qty": item["quantity"]} for item in group_items],
-                "is_grocery": is_grocery,
+                "ship_date": group_items[0][0],
+                "total": sum(item[2] for item in group_items),
+                "items": [{"name": name, "total": total, "qty": qty} for _, name, total, qty, _ in group_items],
+                # A shipment is grocery if all items have a grocery shipping option
+                "is_grocery": all(item[4] in GROCERY_SHIPPING_OPTIONS for item in group_items),
             })
 
         # Sort shipments by date
@@ -688,11 +823,13 @@ def load_order_history(history_dirs: list[str]) -> dict:
 
         orders[order_id] = {
             "shipments": shipments,
-            "items": [{"name": item["name"], "total": item["total"]} for item in items],
+            "items": order["items"],
             "is_grocery": order_is_grocery,
         }
 
     log(f"Loaded {len(orders)} unique orders")
+    from file_writer import save_keyed_pickle_cache
+    save_keyed_pickle_cache(cache_file, cache_key, orders)
     return orders
 
 
@@ -709,7 +846,49 @@ def distribute_amounts(total: Decimal, num_splits: int) -> list:
     return amounts
 
 
-def batch_categorize_items(all_items: dict, client, ynab_categories: list[str], cat_to_group: dict[str, str]) -> dict:
+def parse_chunk_response(response_text: str, item_refs: list, ynab_categories: list[str]) -> list:
+    """Parse a numbered chunk reply - one category per item.
+
+    Returns:
+        [(import_id, item_name, cat, matched), ...] for each line naming an item
+    """
+    parsed = []
+    for line in response_text.strip().split("\n"):
+        line = line.strip()
+        if not line:
+            continue
+        parts = line.split(".", 1)
+        if len(parts) == 2:
+            try:
+                idx = int(parts[0].strip()) - 1
+                cat = parts[1].strip()
+
+                # Clean up category - strip descriptions/explanations after parentheses
+                if "(" in cat:
+                    cat = cat.split("(")[0].strip()
+                # Strip common explanation markers
+                for marker in [" - ", " since ", " because "]:
+                    if marker in cat.lower():
+                        cat = cat.split(marker)[0].strip()
+
+                # Detect if response looks like a product name instead of a category
+                # Product names are typically long, contain commas/sizes, or match the input
+                if looks_like_product(cat):
+                    matched = False  # Force retry
+                else:
+                    # Match category with fuzzy emoji support
+                    cat, matched = match_category(cat, ynab_categories)
+
+                if 0 <= idx < len(item_refs):
+                    import_id, item_name = item_refs[idx]
+                    parsed.append((import_id, item_name, cat, matched))
+            except ValueError:
+                pass
+    return parsed
+
+
+def batch_categorize_items(all_items: dict, client, ynab_categories: list[str], cat_to_group: dict[str, str],
+                           use_batches_api: bool = False) -> dict:
     """
     Batch categorize items in chunks of 20 for reliability.
     Uses cache to avoid re-categorizing known items.
@@ -719,6 +898,7 @@ def batch_categorize_items(all_items: dict, client, ynab_categories: list[str],
         client: Anthropic client
         ynab_categories: List of valid YNAB category names
         cat_to_group: Mapping of category name to group name
+        use_batches_api: Submit all chunks as one Message Batch and wait for it
 
     Returns:
         dict of {import_id: {category: [items]}}
@@ -760,24 +940,39 @@ def batch_categorize_items(all_items: dict, client, ynab_categories: list[str],
     # Build category prompt
     categories_prompt = format_categories_for_prompt(ynab_categories, cat_to_group)
 
+    # Flatten uncached items for per-item categorization
+    all_item_list = [  # [(import_id, item_name), ...]
+        (import_id, item)
+        for import_id, items in items_needing_categorization.items()
+        for item in items
+    ]
 
-    # Flatten all items for per-item categorization
-    all_item_list = []  # [(import_id, item_name), ...]
-    for import_id, data in all_items.items():
-        for item in data["items"]:
-            # Check cache first
-            cached = get_cached_category(item)
-            if cached:
-                results[import_id][cached].append(item)
-            else:
-                all_item_list.append((import_id, item))
+    # Instructions, rules and categories are identical for every chunk, so
+    # they lead each prompt as a cached block; only the products vary
+    static_prompt = f"""Categorize each Amazon product into a budget category.
+{CATEGORIZATION_RULES}
+FORMAT RULES:
+1. Return ONLY the category name (text BEFORE the parentheses)
+2. DO NOT include descriptions or explanations - just the category name
+3. Copy the category name exactly, including any emoji
+4. One category per line, numbered to match products
 
-    if not all_item_list:
-        return results
+Example correct responses:
+1. Snacks
+2. Dairy
+3. 🍌Groceries
+
+Example WRONG responses (never do this):
+1. Snacks - chips and crackers
+2. Dairy (cheese products)
+
+Valid categories (return ONLY the category name, not the description in parentheses):
+{categories_prompt}"""
 
     # Process items in chunks
     item_chunk_size = 30  # items per API call
 
+    chunks = []  # [(item_refs, content), ...]
     for chunk_start in range(0, len(all_item_list), item_chunk_size):
         chunk = all_item_list[chunk_start:chunk_start + item_chunk_size]
 
@@ -794,111 +989,98 @@ def batch_categorize_items(all_items: dict, client, ynab_categories: list[str],
 
         items_numbered = "\n".join([f"{i+1}. {desc}" for i, desc in enumerate(item_descriptions)])
 
-        prompt = f"""Categorize each Amazon product into a budget category.
-
-Products:
+        content = cached_prompt_content(static_prompt, f"""Products:
 {items_numbered}
-{CATEGORIZATION_RULES}
-FORMAT RULES:
-1. Return ONLY the category name (text BEFORE the parentheses)
-2. DO NOT include descriptions or explanations - just the category name
-3. Copy the category name exactly, including any emoji
-4. One category per line, numbered to match products
 
-Example correct responses:
-1. Snacks
-2. Dairy
-3. 🍌Groceries
+Reply:""")
+        chunks.append((item_refs, content))
 
-Example WRONG responses (never do this):
-1. Snacks - chips and crackers
-2. Dairy (cheese products)
+    # A chunk reply is only worth caching if every item got a valid category
+    def chunk_reply_valid(i, response_text):
+        item_refs = chunks[i][0]
+        parsed = parse_chunk_response(response_text, item_refs, ynab_categories)
+        return len(parsed) == len(item_refs) and all(matched for *_, matched in parsed)
 
-Valid categories (return ONLY the category name, not the description in parentheses):
-{categories_prompt}
-
-Reply:"""
+    # Batches API: every chunk in one job; any chunk without a result falls
+    # back to a synchronous call below
+    if use_batches_api:
+        response_texts = categorize_chunks_with_batches_api(
+            [content for _, content in chunks], client, is_valid=chunk_reply_valid
+        )
+    else:
+        response_texts = [None] * len(chunks)
 
+    # Chunks are independent requests, so fetch the remaining ones concurrently.
+    # Rate limiting (429s) is handled by the client's built-in retry/backoff.
+    def fetch_chunk(i):
         try:
-            response = client.messages.create(
-                model=CLAUDE_MODEL,
-                max_tokens=1024,
-                messages=[{"role": "user", "content": prompt}]
+            response_text = create_message_text(
+                client, chunks[i][1], max_tokens=1024,
+                is_valid=lambda text: chunk_reply_valid(i, text),
             )
+        except Exception as e:
+            log(f"  Chunk error: {e}")
+            return None
+
+        # Handle empty response
+        if response_text is None:
+            log(f"  Warning: Empty API response for chunk")
+        return response_text
+
+    missing = [i for i, text in enumerate(response_texts) if text is None]
+    if missing:
+        # Send one chunk alone first so it writes the prompt cache entry the
+        # rest can read; parallel cold requests would each pay for the write
+        first, rest = missing[0], missing[1:]
+        response_texts[first] = fetch_chunk(first)
+        if rest:
+            with ThreadPoolExecutor(max_workers=min(CHUNK_WORKERS, len(rest))) as executor:
+                for i, text in zip(rest, executor.map(fetch_chunk, rest)):
+                    response_texts[i] = text
+        # Persist responses now so a crash while parsing doesn't repeat the calls
+        save_response_cache()
+
+    for (item_refs, _), response_text in zip(chunks, response_texts):
+        if response_text is None:
+            continue
+        try:
+            parsed = parse_chunk_response(response_text, item_refs, ynab_categories)
 
-            # Handle empty response
-            if not response.content:
-                log(f"  Warning: Empty API response for chunk")
-                continue
+            # Retry all unmatched items in the chunk concurrently
+            retries = retry_categorize_items(
+                [item_name for _, item_name, _, matched in parsed if not matched],
+                ynab_categories, client, cat_to_group
+            )
 
-            response_text = response.content[0].text
+            for import_id, item_name, cat, matched in parsed:
+                # Retry if category didn't match
+                if not matched:
+                    retry_cat = retries.get(item_name)
+                    if retry_cat:
+                        log(f"  Retry: '{cat}' -> '{retry_cat}'")
+                        cat = retry_cat
+                    else:
+                        unmatched_categories.add(cat)
 
-            # Parse numbered response - one category per item
-            for line in response_text.strip().split("\n"):
-                line = line.strip()
-                if not line:
-                    continue
-                parts = line.split(".", 1)
-                if len(parts) == 2:
-                    try:
-                        idx = int(parts[0].strip()) - 1
-                        cat = parts[1].strip()
-
-                        # Clean up category - strip descriptions/explanations after parentheses
-                        if "(" in cat:
-                            cat = cat.split("(")[0].strip()
-                        # Strip common explanation markers
-                        for marker in [" - ", " since ", " because "]:
-                            if marker in cat.lower():
-                                cat = cat.split(marker)[0].strip()
-
-                        # Detect if response looks like a product name instead of a category
-                        # Product names are typically long, contain commas/sizes, or match the input
-                        looks_like_product = (
-                            len(cat) > 40 or  # Categories are short
-                            "," in cat or  # Products have commas
-                            "ounce" in cat.lower() or "oz" in cat.lower() or  # Size indicators
-                            "pack" in cat.lower() or "count" in cat.lower() or
-                            cat.lower().startswith("organic ") or  # Product descriptors
-                            "365 " in cat or "by whole foods" in cat.lower()  # Brand names
-                        )
-                        if looks_like_product:
-                            matched = False  # Force retry
-                            cat = cat  # Keep for error logging
-                        else:
-                            # Match category with fuzzy emoji support
-                            cat, matched = match_category(cat, ynab_categories)
-
-                        if 0 <= idx < len(item_refs):
-                            import_id, item_name = item_refs[idx]
-
-                            # Retry if category didn't match
-                            if not matched:
-                                retry_cat = retry_categorize_item(item_name, ynab_categories, client, cat_to_group)
-                                if retry_cat:
-                                    log(f"  Retry: '{cat}' -> '{retry_cat}'")
-                                    cat = retry_cat
-                                else:
-                                    unmatched_categories.add(cat)
-
-                            # Check for suspicious categorization and resubmit if needed
-                            if is_suspicious_categorization(item_name, cat):
-                                new_cat = resubmit_suspicious_item(item_name, cat, ynab_categories, client)
-                                if new_cat != cat:
-                                    cat = new_cat
-
-                            # Store category for this item
-                            results[import_id][cat].append(item_name)
-                            # Cache item with this category
-                            cache_category(item_name, cat)
-                    except ValueError:
-                        pass
+                # Check for suspicious categorization and resubmit if needed
+                if is_suspicious_categorization(item_name, cat):
+                    new_cat = (remap_suspicious_item(item_name, cat, ynab_categories)
+                               or resubmit_suspicious_item(item_name, cat, ynab_categories, client))
+                    if new_cat != cat:
+                        cat = new_cat
+
+                # Store category for this item
+                results[import_id][cat].append(item_name)
+                # Cache item with this category
+                cache_category(item_name, cat)
 
         except Exception as e:
             log(f"  Chunk error: {e}")
 
     # Save cache after batch processing
     save_category_cache()
+    save_response_cache()
+    flush_miscategorization_log()
 
     # Report unmatched categories
     if unmatched_categories:
@@ -1018,16 +1200,9 @@ def submit_batch_categorization(all_items: dict, client, cache_dir: Path, cache_
     categories_prompt = format_categories_for_prompt(ynab_categories, cat_to_group)
 
 
-    # Build batch requests - one request per transaction, categorize each item
-    requests = []
-
-    for import_id, items in items_needing_categorization.items():
-        items_numbered = "\n".join([f"{i+1}. {item[:80]}" for i, item in enumerate(items)])
-
-        prompt = f"""Categorize each Amazon product into a budget category based on what the product is.
-
-Products:
-{items_numbered}
+    # Build batch requests - one request per transaction, categorize each item.
+    # The shared instructions and categories lead each prompt as a cached block.
+    static_prompt = f"""Categorize each Amazon product into a budget category based on what the product is.
 {CATEGORIZATION_RULES}
 FORMAT RULES:
 1. Return ONLY the category name (text BEFORE the parentheses)
@@ -1045,9 +1220,16 @@ Example WRONG responses (never do this):
 2. Dairy (cheese products)
 
 Valid categories (return ONLY the category name, not the description in parentheses):
-{categories_prompt}
+{categories_prompt}"""
+    requests = []
+
+    for import_id, items in items_needing_categorization.items():
+        items_numbered = "\n".join([f"{i+1}. {item[:80]}" for i, item in enumerate(items)])
+
+        content = cached_prompt_content(static_prompt, f"""Products:
+{items_numbered}
 
-Reply:"""
+Reply:""")
 
         # Convert import_id to valid custom_id (no colons allowed)
         custom_id = import_id_to_custom_id(import_id)
@@ -1057,7 +1239,7 @@ Reply:"""
             "params": {
                 "model": "claude-haiku-4-5-20251001",
                 "max_tokens": 256,
-                "messages": [{"role": "user", "content": prompt}]
+                "messages": [{"role": "user", "content": content}]
             }
         })
 
@@ -1164,6 +1346,72 @@ def wait_for_batch(batch_id: str, client, timeout_minutes: int = 10, poll_interv
         time.sleep(poll_interval)
 
 
+def categorize_chunks_with_batches_api(contents: list, client, timeout_minutes: int = 30,
+                                      is_valid=None) -> list[str | None]:
+    """
+    Run categorization prompts as a single Message Batch and wait for it.
+
+    Requests already in the response cache are answered from it and left out
+    of the batch; new results are cached like create_message_text's.
+
+    Args:
+        contents: User message content (string or content blocks) per request
+        is_valid: Optional (index, text) -> bool; only accepted results are
+            cached (or served from the cache)
+
+    Returns:
+        Response text per request, or None where the request didn't succeed
+    """
+    texts = [None] * len(contents)
+    keys = [response_cache_key(CLAUDE_MODEL, 1024, content) for content in contents]
+    for i, key in enumerate(keys):
+        cached = get_cached_response(key)
+        if cached is not None:
+            if is_valid is None or is_valid(i, cached):
+                texts[i] = cached
+            else:
+                evict_cached_response(key)
+
+    pending = [i for i, text in enumerate(texts) if text is None]
+    if not pending:
+        return texts
+
+    try:
+        batch = client.messages.batches.create(requests=[
+            {
+                "custom_id": f"chunk-{i}",
+                "params": {
+                    "model": CLAUDE_MODEL,
+                    "max_tokens": 1024,
+                    "messages": [{"role": "user", "content": contents[i]}]
+                }
+            }
+            for i in pending
+        ])
+    except Exception as e:
+        log(f"  Batch submission failed, using synchronous API: {e}")
+        return texts
+
+    log(f"  Submitted {len(pending)} chunks as batch {batch.id}")
+    status = wait_for_batch(batch.id, client, timeout_minutes=timeout_minutes, poll_interval=15)
+    if "error" in status:
+        log(f"  Batch failed, using synchronous API: {status['error']}")
+        return texts
+
+    try:
+        for result in client.messages.batches.results(batch.id):
+            if result.result.type == "succeeded" and result.result.message.content:
+                idx = int(result.custom_id.split("-", 1)[1])
+                texts[idx] = result.result.message.content[0].text
+                if is_valid is None or is_valid(idx, texts[idx]):
+                    cache_response(keys[idx], texts[idx])
+            else:
+                log(f"  Request {result.custom_id} failed: {result.result.type}")
+    except Exception as e:
+        log(f"  Error retrieving batch results: {e}")
+    return texts
+
+
 def retrieve_batch_results(batch_id: str, client, cache_dir: Path) -> dict:
     """
     Retrieve results from a completed batch and apply categorizations.
@@ -1209,6 +1457,7 @@ def retrieve_batch_results(batch_id: str, client, cache_dir: Path) -> dict:
     # Get results from API
     results = {}
     unmatched_categories = {}  # cat -> list of items assigned to it
+    pending_retries = []  # [(import_id, item_name, cat), ...] retried after the loop
     try:
         for result in client.messages.batches.results(batch_id):
             # Convert custom_id back to import_id
@@ -1244,15 +1493,7 @@ def retrieve_batch_results(batch_id: str, client, cache_dir: Path) -> dict:
                                     item_name = items[idx]
 
                                     # Detect product names (too long, contains size/brand indicators)
-                                    looks_like_product = (
-                                        len(cat) > 40 or "," in cat or
-                                        "ounce" in cat.lower() or "oz" in cat.lower() or
-                                        "pack" in cat.lower() or "count" in cat.lower() or
-                                        cat.lower().startswith("organic ") or
-                                        "365 " in cat or "by whole foods" in cat.lower()
-                                    )
-
-                                    if looks_like_product:
+                                    if looks_like_product(cat):
                                         was_matched = False
                                         matched_cat = cat
                                     else:
@@ -1263,21 +1504,8 @@ def retrieve_batch_results(batch_id: str, client, cache_dir: Path) -> dict:
                                         categories[matched_cat].append(item_name)
                                         cache_category(item_name, matched_cat)
                                     else:
-                                        # Retry with synchronous API call
-                                        retry_cat = retry_categorize_item(item_name, ynab_categories, client, cat_to_group)
-                                        if retry_cat:
-                                            log(f"  Retry: '{cat[:30]}...' -> '{retry_cat}'")
-                                            categories[retry_cat].append(item_name)
-                                            cache_category(item_name, retry_cat)
-                                        else:
-                                            # Track unmatched category for logging
-                                            if cat not in unmatched_categories:
-                                                unmatched_categories[cat] = []
-                                            unmatched_categories[cat].append(item_name)
-                                            # Use fallback category instead of invalid name
-                                            fallback = "🍌Groceries" if "🍌Groceries" in ynab_categories else "Groceries"
-                                            categories[fallback].append(item_name)
-                                            cache_category(item_name, fallback)
+                                        # Retry with synchronous API calls once all results are parsed
+                                        pending_retries.append((import_id, item_name, cat))
                             except ValueError:
                                 pass
 
@@ -1286,6 +1514,27 @@ def retrieve_batch_results(batch_id: str, client, cache_dir: Path) -> dict:
                 log(f"  Request {import_id} failed: {result.result.type}")
                 results[import_id] = {}
 
+        # Retry every unmatched item in the batch concurrently
+        retries = retry_categorize_items(
+            [item_name for _, item_name, _ in pending_retries],
+            ynab_categories, client, cat_to_group
+        )
+        for import_id, item_name, cat in pending_retries:
+            retry_cat = retries.get(item_name)
+            if retry_cat:
+                log(f"  Retry: '{cat[:30]}...' -> '{retry_cat}'")
+                results[import_id].setdefault(retry_cat, []).append(item_name)
+                cache_category(item_name, retry_cat)
+            else:
+                # Track unmatched category for logging
+                if cat not in unmatched_categories:
+                    unmatched_categories[cat] = []
+                unmatched_categories[cat].append(item_name)
+                # Use fallback category instead of invalid name
+                fallback = "🍌Groceries" if "🍌Groceries" in ynab_categories else "Groceries"
+                results[import_id].setdefault(fallback, []).append(item_name)
+                cache_category(item_name, fallback)
+
         # Save category cache
         save_category_cache()
 
@@ -1448,7 +1697,7 @@ def load_cache(cache_file: Path) -> dict:
 
 
 # Write operations delegated to file_writer module
-from file_writer import save_cache, save_csv_report
+from file_writer import flush_miscategorization_log, log_miscategorization, save_cache, save_csv_report
 
 
 def main():
@@ -1460,6 +1709,7 @@ Batch Processing (50% cheaper, up to 24 hours):
   Submit:  python process_transactions.py data/amazon/ynab_amazon_2025.csv --batch
   Status:  python process_transactions.py --batch-status
   Results: python process_transactions.py --batch-results BATCH_ID
+  Or wait: python process_transactions.py data/amazon/ynab_amazon_2025.csv --batch-wait
         """
     )
     parser.add_argument("input", nargs="?", help="Input bank statement CSV")
@@ -1471,6 +1721,8 @@ Batch Processing (50% cheaper, up to 24 hours):
     # Batch processing options
     parser.add_argument("--batch", "-b", action="store_true",
                         help="Use Batches API (50%% cheaper, async processing)")
+    parser.add_argument("--batch-wait", action="store_true",
+                        help="Use Batches API and wait for results (50%% cheaper, no separate --batch-results step)")
     parser.add_argument("--batch-status", nargs="?", const="all", metavar="BATCH_ID",
                         help="Check status of batch jobs (specify ID or omit for all)")
     parser.add_argument("--batch-results", metavar="BATCH_ID",
@@ -1529,6 +1781,7 @@ Batch Processing (50% cheaper, up to 24 hours):
 
     log("Loading category cache...")
     load_category_cache()
+    load_response_cache()
 
     log("Fetching YNAB categories...")
     ynab_categories, cat_to_group = get_ynab_categories()
@@ -1859,10 +2112,11 @@ Batch Processing (50% cheaper, up to 24 hours):
             else:
                 log("Batch submission failed or all items were cached")
         else:
-            # Use synchronous API (immediate results)
+            # Use synchronous API (immediate results), or a batch we wait on
             log(f"\nPass 2: Categorizing {len(items_to_categorize)} transactions...")
             categorized_results = batch_categorize_items(items_to_categorize, claude,
-                                                         ynab_categories, cat_to_group)
+                                                         ynab_categories, cat_to_group,
+                                                         use_batches_api=args.batch_wait)
 
             # Apply categorization results - ONE SPLIT PER ITEM
             for txn in pending_txns:
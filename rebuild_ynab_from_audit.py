@@ -288,7 +288,6 @@ Important: If you're uncertain about an item, use "Uncategorized" as the categor
             for item in uncached_items:
                 result[item] = "Uncategorized"
 
-        save_category_cache()
         return result
 
 
@@ -672,6 +671,9 @@ class YNABRebuilder:
                 log(f"  ERROR processing {tx.date} {tx.tx_type}: {e}")
                 errors += 1
 
+        # Persist categories learned for this month in a single write
+        save_category_cache()
+
         # Send batch to YNAB
         if batch and not self.dry_run:
             try:
@@ -1,10 +1,16 @@
 """Shared utilities for YNAB Amazon Itemizer."""
 
+import hashlib
 import json
 import os
+import pickle
 import re
+import threading
+import time
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, List, Optional
+
+from config import LLM_CACHE_TTL_DAYS
 
 # Category to category group mapping
 CATEGORY_TO_GROUP = {
@@ -50,11 +56,122 @@ def get_cache_dir() -> Path:
     return cache_dir
 
 
+def hash_files(paths: List[str]) -> str:
+    """Hash the contents of the given files (missing files are skipped).
+
+    Used to key on-disk caches so they invalidate when any input changes.
+    """
+    h = hashlib.blake2b(digest_size=16)
+    for path in paths:
+        if not os.path.exists(path):
+            continue
+        h.update(path.encode())
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+    return h.hexdigest()
+
+
+def load_pickle_cache(cache_file: Path) -> Optional[Any]:
+    """Load a pickled cache file, returning None if missing or unreadable."""
+    if not cache_file.exists():
+        return None
+    try:
+        with open(cache_file, "rb") as f:
+            return pickle.load(f)
+    except Exception:
+        # Truncated files, or pickles of classes/modules that have since
+        # changed (AttributeError, ImportError, ...): just rebuild
+        return None
+
+
+def load_keyed_pickle_cache(cache_file: Path, key: str) -> Optional[Any]:
+    """Load data saved by file_writer.save_keyed_pickle_cache if its key still matches.
+
+    Keyed caches live in one fixed file that each save overwrites, so a
+    changed input (different key) never leaves old cache files behind.
+    """
+    payload = load_pickle_cache(cache_file)
+    if isinstance(payload, dict) and payload.get("key") == key:
+        return payload.get("data")
+    return None
+
+
+def get_transactions_cached(
+    client,
+    budget_id: str,
+    account_id: Optional[str] = None,
+    since_date: Optional[str] = None,
+) -> list:
+    """Get transactions, syncing only the delta since the last run.
+
+    Raw transactions and YNAB's server_knowledge are cached per account.
+    Warm runs pass last_knowledge_of_server so YNAB returns only changed
+    (or deleted) transactions, which are merged into the cached set.
+
+    Args:
+        client: YNABClient instance
+        budget_id: The budget ID
+        account_id: Optional account to restrict to
+        since_date: Optional date to start from (YYYY-MM-DD)
+
+    Returns:
+        List of YNABTransaction sorted by date.
+    """
+    # Subdirectory keeps these out of the sync cache *.json glob
+    cache_file = get_cache_dir() / "ynab_transactions" / f"{account_id or budget_id}.json"
+
+    cached = None
+    if cache_file.exists():
+        try:
+            with open(cache_file, "r") as f:
+                cached = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            cached = None
+    if cached and cached.get("since_date") != since_date:
+        cached = None
+
+    if cached:
+        by_id = cached["transactions"]
+        delta, server_knowledge = client.get_transactions_delta(
+            budget_id, account_id, since_date, cached["server_knowledge"]
+        )
+    else:
+        by_id = {}
+        delta, server_knowledge = client.get_transactions_delta(budget_id, account_id, since_date)
+
+    for trans in delta:
+        if trans.get("deleted"):
+            by_id.pop(trans["id"], None)
+        else:
+            by_id[trans["id"]] = trans
+
+    if not cached or server_knowledge != cached["server_knowledge"]:
+        from file_writer import save_cache
+        save_cache(cache_file, {
+            "server_knowledge": server_knowledge,
+            "since_date": since_date,
+            "transactions": by_id,
+        })
+
+    raw = sorted(by_id.values(), key=lambda t: t["date"])
+    return [client.parse_transaction(t) for t in raw]
+
+
 def log(msg: str):
     """Print a log message with immediate flush."""
     print(msg, flush=True)
 
 
+def log_progress(done: int, total: int, label: str, every: int = 25) -> None:
+    """Log a progress line every `every` items and on the last one.
+
+    Keeps bulk write loops from printing (and flushing) once per item.
+    """
+    if done % every == 0 or done == total:
+        log(f"  {label} {done}/{total}...")
+
+
 def extract_order_id(memo: str) -> Optional[str]:
     """Extract Amazon order ID from memo field."""
     if not memo:
@@ -83,6 +200,7 @@ def is_grocery_transaction(payee: str) -> bool:
 _category_cache: Dict[str, str] = {}
 _cache_file: Optional[Path] = None
 _cache_dirty: bool = False
+_category_cache_lock = threading.Lock()
 
 
 def _normalize_item_name(name: str) -> str:
@@ -140,8 +258,9 @@ def cache_category(item_name: str, category: str) -> None:
     global _cache_dirty
     key = _normalize_item_name(item_name)
     if key and category:
-        _category_cache[key] = category
-        _cache_dirty = True
+        with _category_cache_lock:
+            _category_cache[key] = category
+            _cache_dirty = True
 
 
 def save_category_cache() -> None:
@@ -155,5 +274,85 @@ def save_category_cache() -> None:
         return
 
     from file_writer import save_category_cache as _save_cache
-    if _save_cache(_cache_file, _category_cache, _cache_dirty):
-        _cache_dirty = False
+    # Hold the lock so concurrent cache_category calls can't mutate the dict mid-dump
+    with _category_cache_lock:
+        if _save_cache(_cache_file, _category_cache, _cache_dirty):
+            _cache_dirty = False
+
+
+# Claude response cache - maps request hashes to response text, so identical
+# prompts on later runs (or after a crash) skip the API call
+_response_cache: Dict[str, Dict[str, Any]] = {}
+_response_cache_file: Optional[Path] = None
+_response_cache_dirty: bool = False
+
+
+def response_cache_key(model: str, max_tokens: int, content: Any) -> str:
+    """Hash a Claude request (model, max_tokens and message content) into a cache key."""
+    payload = json.dumps([model, max_tokens, content], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def load_response_cache(cache_dir: Optional[Path] = None) -> Dict[str, Dict[str, Any]]:
+    """Load the Claude response cache from disk, dropping expired entries.
+
+    Args:
+        cache_dir: Directory to store cache file. Defaults to get_cache_dir().
+
+    Returns:
+        Dictionary mapping request hashes to {"response", "ts"} entries.
+    """
+    global _response_cache, _response_cache_file, _response_cache_dirty
+
+    if cache_dir is None:
+        cache_dir = get_cache_dir()
+
+    _response_cache_file = cache_dir / "llm_response_cache.json"
+
+    loaded = {}
+    if _response_cache_file.exists():
+        try:
+            with open(_response_cache_file, "r") as f:
+                loaded = json.load(f)
+        except (json.JSONDecodeError, IOError):
+            loaded = {}
+
+    cutoff = time.time() - LLM_CACHE_TTL_DAYS * 24 * 60 * 60
+    _response_cache = {k: v for k, v in loaded.items() if v.get("ts", 0) >= cutoff}
+    _response_cache_dirty = len(_response_cache) != len(loaded)
+    return _response_cache
+
+
+def get_cached_response(key: str) -> Optional[str]:
+    """Get a cached Claude response for a request hash, or None."""
+    entry = _response_cache.get(key)
+    return entry["response"] if entry else None
+
+
+def cache_response(key: str, response: str) -> None:
+    """Cache a Claude response under its request hash."""
+    global _response_cache_dirty
+    _response_cache[key] = {"response": response, "ts": int(time.time())}
+    _response_cache_dirty = True
+
+
+def evict_cached_response(key: str) -> None:
+    """Drop a cached Claude response, e.g. one that turned out to be unusable."""
+    global _response_cache_dirty
+    if _response_cache.pop(key, None) is not None:
+        _response_cache_dirty = True
+
+
+def save_response_cache() -> None:
+    """Save the Claude response cache to disk if modified.
+
+    NOTE: This is a write operation. The actual write is delegated to file_writer.
+    """
+    global _response_cache_dirty
+
+    if not _response_cache_dirty or not _response_cache_file:
+        return
+
+    from file_writer import save_response_cache as _save_cache
+    if _save_cache(_response_cache_file, _response_cache):
+        _response_cache_dirty = False
@@ -7,12 +7,19 @@ For write operations (create, update, delete), use ynab_writer.py.
 import requests
 from datetime import datetime
 from decimal import Decimal
-from typing import List, Dict, Optional
+from typing import List, Dict, Optional, Tuple
 
 
 class YNABTransaction:
     """Represents a YNAB transaction."""
 
+    # Scripts hold thousands of these; slots drop the per-instance __dict__
+    __slots__ = (
+        "date", "payee_name", "amount", "memo", "cleared", "transaction_id",
+        "account_id", "category_id", "category_name", "approved", "flag_color",
+        "subtransactions", "import_id",
+    )
+
     def __init__(
         self,
         date: datetime,
@@ -50,6 +57,8 @@ class YNABTransaction:
 class YNABCategory:
     """Represents a YNAB category."""
 
+    __slots__ = ("category_id", "name", "group_name", "group_id")
+
     def __init__(self, category_id: str, name: str, group_name: str, group_id: str):
         self.category_id = category_id
         self.name = name
@@ -88,6 +97,8 @@ class YNABClient:
             "Authorization": f"Bearer {access_token}",
             "Content-Type": "application/json"
         }
+        # Shared with YNABWriter so reads and writes reuse pooled connections
+        self.session = requests.Session()
 
     def _get(self, endpoint: str) -> Dict:
         """Make a GET request to the YNAB API with retry on rate limit.
@@ -100,7 +111,7 @@ class YNABClient:
         response = None
 
         for attempt in range(5):
-            response = requests.get(url, headers=self.headers)
+            response = self.session.get(url, headers=self.headers)
 
             if response.status_code == 429:
                 wait = 30 * (attempt + 1)  # 30, 60, 90, 120, 150 seconds
@@ -153,11 +164,27 @@ class YNABClient:
     # Read Operations - Categories
     # =========================================================================
 
-    def get_categories(self, budget_id: str) -> List[YNABCategory]:
-        """Get all categories for a budget."""
-        data = self._get(f"/budgets/{budget_id}/categories")
+    def get_category_groups(
+        self,
+        budget_id: str,
+        last_knowledge_of_server: Optional[int] = None
+    ) -> Tuple[List[Dict], int]:
+        """Get raw category groups and the server_knowledge they reflect.
+
+        With last_knowledge_of_server, YNAB returns only groups whose
+        categories changed since then (an empty list means no changes).
+        """
+        endpoint = f"/budgets/{budget_id}/categories"
+        if last_knowledge_of_server is not None:
+            endpoint += f"?last_knowledge_of_server={last_knowledge_of_server}"
+        data = self._get(endpoint).get("data", {})
+        return data.get("category_groups", []), data.get("server_knowledge", 0)
+
+    @staticmethod
+    def categories_from_groups(category_groups: List[Dict]) -> List[YNABCategory]:
+        """Flatten raw category groups, skipping hidden/internal ones."""
         categories = []
-        for group in data.get("data", {}).get("category_groups", []):
+        for group in category_groups:
             group_name = group["name"]
             group_id = group["id"]
             # Skip internal groups
@@ -173,6 +200,11 @@ class YNABClient:
                     ))
         return categories
 
+    def get_categories(self, budget_id: str) -> List[YNABCategory]:
+        """Get all categories for a budget."""
+        category_groups, _ = self.get_category_groups(budget_id)
+        return self.categories_from_groups(category_groups)
+
     def get_categories_by_group(self, budget_id: str, group_name: str) -> List[YNABCategory]:
         """Get all categories in a specific category group."""
         all_categories = self.get_categories(budget_id)
@@ -198,21 +230,86 @@ class YNABClient:
     # Read Operations - Transactions
     # =========================================================================
 
+    @staticmethod
+    def parse_transaction(trans: Dict) -> YNABTransaction:
+        """Build a YNABTransaction from a raw API transaction dict."""
+        return YNABTransaction(
+            date=datetime.strptime(trans["date"], "%Y-%m-%d"),
+            payee_name=trans.get("payee_name", ""),
+            amount=Decimal(trans["amount"]) / 1000,
+            memo=trans.get("memo", ""),
+            cleared=trans.get("cleared", ""),
+            transaction_id=trans["id"],
+            account_id=trans.get("account_id"),
+            category_id=trans.get("category_id"),
+            category_name=trans.get("category_name"),
+            approved=trans.get("approved", False),
+            flag_color=trans.get("flag_color"),
+            subtransactions=trans.get("subtransactions", []),
+            import_id=trans.get("import_id")
+        )
+
+    def get_transactions_delta(
+        self,
+        budget_id: str,
+        account_id: Optional[str] = None,
+        since_date: Optional[str] = None,
+        last_knowledge_of_server: Optional[int] = None
+    ) -> Tuple[List[Dict], int]:
+        """Get raw transactions changed since a previous server knowledge value.
+
+        Args:
+            budget_id: The budget ID
+            account_id: Optional account to restrict to
+            since_date: Optional date to start from (YYYY-MM-DD)
+            last_knowledge_of_server: server_knowledge from a previous call,
+                or None to fetch everything
+
+        Returns:
+            (raw transaction dicts, new server_knowledge). Deleted
+            transactions are included with "deleted": true.
+        """
+        if account_id:
+            endpoint = f"/budgets/{budget_id}/accounts/{account_id}/transactions"
+        else:
+            endpoint = f"/budgets/{budget_id}/transactions"
+
+        params = []
+        if since_date:
+            params.append(f"since_date={since_date}")
+        if last_knowledge_of_server is not None:
+            params.append(f"last_knowledge_of_server={last_knowledge_of_server}")
+        if params:
+            endpoint += "?" + "&".join(params)
+
+        data = self._get(endpoint).get("data", {})
+        return data.get("transactions", []), data.get("server_knowledge", 0)
+
     def get_transactions(
         self,
         budget_id: str,
         account_id: Optional[str] = None,
         since_date: Optional[str] = None,
-        unapproved_only: bool = False
+        unapproved_only: bool = False,
+        transaction_type: Optional[str] = None
     ) -> List[YNABTransaction]:
-        """Get transactions for a budget or specific account."""
+        """Get transactions for a budget or specific account.
+
+        transaction_type ("uncategorized" or "unapproved") filters server-side,
+        which keeps the response small when only those rows are needed.
+        """
         if account_id:
             endpoint = f"/budgets/{budget_id}/accounts/{account_id}/transactions"
         else:
             endpoint = f"/budgets/{budget_id}/transactions"
 
+        params = []
         if since_date:
-            endpoint += f"?since_date={since_date}"
+            params.append(f"since_date={since_date}")
+        if transaction_type:
+            params.append(f"type={transaction_type}")
+        if params:
+            endpoint += "?" + "&".join(params)
 
         data = self._get(endpoint)
         transactions = []
@@ -222,24 +319,7 @@ class YNABClient:
             if unapproved_only and trans.get("approved", False):
                 continue
 
-            amount = Decimal(trans["amount"]) / 1000
-
-            transaction = YNABTransaction(
-                date=datetime.strptime(trans["date"], "%Y-%m-%d"),
-                payee_name=trans.get("payee_name", ""),
-                amount=amount,
-                memo=trans.get("memo", ""),
-                cleared=trans.get("cleared", ""),
-                transaction_id=trans["id"],
-                account_id=trans.get("account_id"),
-                category_id=trans.get("category_id"),
-                category_name=trans.get("category_name"),
-                approved=trans.get("approved", False),
-                flag_color=trans.get("flag_color"),
-                subtransactions=trans.get("subtransactions", []),
-                import_id=trans.get("import_id")
-            )
-            transactions.append(transaction)
+            transactions.append(self.parse_transaction(trans))
 
         return transactions
 
@@ -291,23 +371,7 @@ class YNABClient:
             if not trans:
                 return None
 
-            amount = Decimal(trans["amount"]) / 1000
-
-            return YNABTransaction(
-                date=datetime.strptime(trans["date"], "%Y-%m-%d"),
-                payee_name=trans.get("payee_name", ""),
-                amount=amount,
-                memo=trans.get("memo", ""),
-                cleared=trans.get("cleared", ""),
-                transaction_id=trans["id"],
-                account_id=trans.get("account_id"),
-                category_id=trans.get("category_id"),
-                category_name=trans.get("category_name"),
-                approved=trans.get("approved", False),
-                flag_color=trans.get("flag_color"),
-                subtransactions=trans.get("subtransactions", []),
-                import_id=trans.get("import_id")
-            )
+            return self.parse_transaction(trans)
         except Exception:
             return None
 
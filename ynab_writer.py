@@ -7,7 +7,6 @@ IMPORTANT: Importing from this module indicates destructive intent and
 will trigger permission prompts via the auto_approve_reads hook.
 """
 
-import requests
 import time
 from decimal import Decimal
 from typing import Dict, List, Optional
@@ -41,15 +40,16 @@ class YNABWriter:
         """
         url = f"{self.BASE_URL}{endpoint}"
         headers = self.client.headers
+        session = self.client.session
         response = None
 
         for attempt in range(5):
             if method == "POST":
-                response = requests.post(url, headers=headers, json=json_data)
+                response = session.post(url, headers=headers, json=json_data)
             elif method == "PUT":
-                response = requests.put(url, headers=headers, json=json_data)
+                response = session.put(url, headers=headers, json=json_data)
             elif method == "DELETE":
-                response = requests.delete(url, headers=headers)
+                response = session.delete(url, headers=headers)
             else:
                 raise ValueError(f"Unsupported write method: {method}")
 